@@ -1,5 +1,7 @@
 import os
-from pymongo import MongoClient
+import threading
+import time
+from pymongo import DeleteMany, MongoClient, UpdateOne, monitoring
 from pymongo.errors import ConnectionFailure
 from dotenv import load_dotenv
 from bson import json_util
@@ -15,45 +17,409 @@ ny_time = datetime.now(ZoneInfo("America/New_York"))
 today_str = ny_time.strftime('%Y-%m-%d')
 
 
+# 連接池設定 (可用環境變量覆蓋)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+# is_connected() 結果的緩存秒數，避免每次操作都 ping
+MONGO_HEALTH_TTL = float(os.getenv("MONGO_HEALTH_TTL", "5"))
+# list_collection_names() 結果的緩存秒數
+MONGO_COLLECTION_CACHE_TTL = float(os.getenv("MONGO_COLLECTION_CACHE_TTL", "60"))
+
+
+#region Index Registry
+# 各集合需要的索引 (啟動時由 MongoHandler.ensure_indexes() 建立)
+INDEX_REGISTRY = {
+    "fundamentals_of_top_list_symbols": [
+        # /stocks/{symbol}... 按 symbol + today_date 查詢，並按日期取最新
+        [("symbol", 1), ("today_date", -1)],
+        # 列表頁 / latest_day / by_date / top-movers 按日期 + 漲幅排序；
+        # _id 作為最後一個鍵，keyset 分頁 (api/services/pagination.py) 的排序和範圍查詢都走索引
+        [("today_date", -1), ("close_change_percentage", -1), ("_id", -1)],
+        [("today_date", -1), ("high_change_percentage", -1)],
+        # 沒有指定日期的 top-movers 跨所有日期按漲幅排序
+        [("close_change_percentage", -1)],
+        [("high_change_percentage", -1)],
+    ],
+}
+
+
+#region Trading Dates Catalog
+# trading_dates 集合: 每個交易日一條 (_id = 日期)，記錄股票數量、漲幅最大的股票和更新時間。
+# MongoHandler 對 CATALOG_SOURCE_COLLECTION 的寫入 (create / upsert / update / delete) 改到 CATALOG_FIELDS 時
+# 更新受影響的日期；其他程序 (例如 bot) 的寫入由 reconcile_trading_dates 補齊 (API 的後台任務定時執行)，
+# 歷史數據用 dev_test/backfill_trading_dates.py 重建。
+# 下面的函數只負責構造查詢和寫入操作，MongoHandler 和 AsyncMongoHandler 共用。
+TRADING_DATES_COLLECTION = "trading_dates"
+CATALOG_SOURCE_COLLECTION = "fundamentals_of_top_list_symbols"
+# 改到這些字段時目錄的統計 (股票數量、漲幅最大的股票) 才會變化
+CATALOG_FIELDS = {"today_date", "symbol", "close_change_percentage"}
+CATALOG_PROJECTION = {"_id": 0, **{field: 1 for field in CATALOG_FIELDS}}
+
+
+def trading_dates_pipeline(match=None):
+    """按 today_date 分組統計股票數量和漲幅最大的股票"""
+    pipeline = []
+    if match:
+        pipeline.append({"$match": match})
+    pipeline += [
+        {"$sort": {"today_date": -1, "close_change_percentage": -1}},
+        {"$group": {
+            "_id": "$today_date",
+            "symbol_count": {"$sum": 1},
+            "top_mover": {"$first": {"symbol": "$symbol", "close_change_percentage": "$close_change_percentage"}},
+        }},
+    ]
+    return pipeline
+
+
+def trading_date_entry(group, updated_at):
+    """trading_dates_pipeline 的一個分組轉成 catalog 文檔 ($set 的內容)"""
+    top_mover = group.get("top_mover") or {}
+    if top_mover.get("close_change_percentage") is None:
+        top_mover = None
+    return {
+        "date": group["_id"],
+        "symbol_count": group["symbol_count"],
+        "top_mover": top_mover,
+        "updated_at": updated_at,
+    }
+
+
+def trading_date_operations(groups, updated_at, dates=None):
+    """trading_dates_pipeline 的結果轉成 trading_dates 的寫入操作，返回 (目錄條目, bulk_write 操作)
+
+    dates 是重新統計的日期 (None = 全部歷史)，其中已經沒有數據的日期從目錄刪除。
+    """
+    entries = [trading_date_entry(group, updated_at) for group in groups if group["_id"]]
+    operations = [UpdateOne({"_id": entry["date"]}, {"$set": entry}, upsert=True) for entry in entries]
+    if dates is not None:
+        empty = sorted(set(dates) - {entry["date"] for entry in entries})
+        if empty:
+            operations.append(DeleteMany({"_id": {"$in": empty}}))
+    return entries, operations
+
+
+def trading_date_increment(doc, updated_at):
+    """插入一個文檔後 trading_dates 的增量更新 (update pipeline)，不需要重新統計整天"""
+    top_mover = {"$ifNull": ["$top_mover", None]}
+    if doc.get("close_change_percentage") is not None:
+        candidate = {"symbol": doc.get("symbol"), "close_change_percentage": doc["close_change_percentage"]}
+        top_mover = {"$cond": [
+            {"$gt": [doc["close_change_percentage"], {"$ifNull": ["$top_mover.close_change_percentage", None]}]},
+            {"$literal": candidate},
+            top_mover,
+        ]}
+    return [{"$set": {
+        "date": doc["today_date"],
+        "symbol_count": {"$add": [{"$ifNull": ["$symbol_count", 0]}, 1]},
+        "top_mover": top_mover,
+        "updated_at": updated_at,
+    }}]
+
+
+def reconcile_dates(source_dates, catalog_ids):
+    """對比源集合和目錄的日期，返回需要重新統計的日期
+
+    目錄缺少的 (還沒回填，或由其他程序寫入)、源集合已經沒有的 (重新統計時被刪除)，
+    以及最新的一天 (bot 當天仍在寫入)。
+    """
+    source_dates = {date for date in source_dates if isinstance(date, str)}
+    dates = source_dates.symmetric_difference(catalog_ids)
+    if source_dates:
+        dates.add(max(source_dates))
+    return dates
+
+
+def touches_catalog(collection_name, update=None):
+    """這次寫入是否可能影響 trading_dates: update 是 $set 的內容 (None 表示刪除)"""
+    if collection_name != CATALOG_SOURCE_COLLECTION:
+        return False
+    return update is None or bool(CATALOG_FIELDS.intersection(update))
+
+
+def catalog_dates(docs, update=None, upsert=False):
+    """根據寫入前的文檔 (CATALOG_PROJECTION) 找出這次寫入會影響 trading_dates 的哪些日期
+
+    刪除 (update 為 None) 影響每個文檔的日期；$set 只在 CATALOG_FIELDS 的值真的改變時影響
+    原來和新的日期 (bot 重複寫入同一天的相同數據不會觸發重新統計)；upsert 沒有匹配時插入新文檔。
+    """
+    if update is None:
+        dates = {doc.get("today_date") for doc in docs}
+    else:
+        changes = {field: value for field, value in update.items() if field in CATALOG_FIELDS}
+        dates = set()
+        for doc in docs:
+            if any(doc.get(field) != value for field, value in changes.items()):
+                dates.update((doc.get("today_date"), changes.get("today_date")))
+        if not docs and upsert:
+            dates.add(changes.get("today_date"))
+    return {date for date in dates if isinstance(date, str)}
+
+
+#region Cache Invalidations
+# cache_invalidations 集合: 每個股票代碼一條 (_id = 代碼)，updated_at 由服務器寫入 ($currentDate)。
+# 數據在 API 進程之外被修改時 (例如 Dash 的新聞回調) 寫入一條，API 輪詢後讓對應的響應緩存失效。
+CACHE_INVALIDATIONS_COLLECTION = "cache_invalidations"
+
+
+#region Shared Query Helpers
+def build_index_report(index_list, index_information, index_stats):
+    """根據 index_information() 和 $indexStats 的結果生成單個集合的索引報告"""
+    existing = {name: info["key"] for name, info in index_information.items()}
+    existing_keys = {tuple((k, int(v)) for k, v in key): name for name, key in existing.items()}
+    declared_keys = {tuple(keys) for keys in index_list}
+    usage = {stat["name"]: stat.get("accesses", {}).get("ops", 0) for stat in index_stats}
+    return {
+        "missing": [list(keys) for keys in declared_keys if keys not in existing_keys],
+        "undeclared": [name for keys, name in existing_keys.items()
+                       if keys not in declared_keys and name != "_id_"],
+        "unused": [name for name, ops in usage.items() if ops == 0 and name != "_id_"],
+        "usage": usage,
+    }
+
+
+#region Pool Metrics
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """統計連接池的 checkout 次數和等待時間"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.checked_in = 0
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+
+    def snapshot(self):
+        with self._lock:
+            avg_wait_ms = self.total_wait_ms / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "checked_in": self.checked_in,
+                "in_use": self.checkouts - self.checked_in,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "total_wait_ms": round(self.total_wait_ms, 3),
+                "avg_wait_ms": round(avg_wait_ms, 3),
+                "max_wait_ms": round(self.max_wait_ms, 3),
+            }
+
+    def connection_check_out_started(self, event):
+        self._local.started_at = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        # 新版 pymongo 的事件自帶等待時間 (異步 client 多個任務共用一個線程時也準確)
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            wait_ms = duration * 1000
+        else:
+            started_at = getattr(self._local, "started_at", None)
+            wait_ms = (time.perf_counter() - started_at) * 1000 if started_at else 0.0
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_in += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+
+#region Connection State
+class ConnectionStateTracker(monitoring.TopologyListener):
+    """根據 pymongo 的拓撲監控事件記錄連接狀態，不需要額外 ping"""
+
+    def __init__(self):
+        # None 表示還沒收到任何 heartbeat 結果
+        self.connected = None
+        self.changed_at = None
+
+    def opened(self, event):
+        pass
+
+    def description_changed(self, event):
+        # 啟動時服務器狀態都是 Unknown，等第一次 heartbeat 完成才開始記錄
+        if self.connected is None and not event.new_description.has_known_servers:
+            return
+        self.connected = event.new_description.has_readable_server()
+        self.changed_at = time.monotonic()
+
+    def closed(self, event):
+        self.connected = False
+        self.changed_at = time.monotonic()
+
+
 class MongoHandler:
 
     #region Constructor
-    def __init__(self):
+    def __init__(self, max_pool_size=None, min_pool_size=None):
+        self.max_pool_size = max_pool_size or MONGO_MAX_POOL_SIZE
+        self.min_pool_size = min_pool_size if min_pool_size is not None else MONGO_MIN_POOL_SIZE
+        self.pool_metrics = PoolMetricsListener()
+        self.connection_state = ConnectionStateTracker()
+        self._collections = set()
+        self._collections_loaded_at = 0.0
+        self._client = None
+        self._db = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._healthy = False
+        self._health_checked_at = 0.0
+        self._connect()
+
+
+    #region Connect
+    def _connect(self):
+        """建立 MongoClient；fork 之後在子進程中會重新建立"""
         try:
             mongo_uri = os.getenv("MONGODB_CONNECTION_STRING")
-            self.client = MongoClient(mongo_uri, serverSelectionTimeoutMS=3000)
-            self.db = self.client[os.getenv("MONGO_DBNAME", "TradeZero_Bot")]
+            self._client = MongoClient(
+                mongo_uri,
+                serverSelectionTimeoutMS=3000,
+                maxPoolSize=self.max_pool_size,
+                minPoolSize=self.min_pool_size,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                event_listeners=[self.pool_metrics, self.connection_state],
+            )
+            self._db = self._client[os.getenv("MONGO_DBNAME", "TradeZero_Bot")]
         except Exception as e:
             print(f"Connection error: {e}")
-            self.client = None
-            self.db = None
+            self._client = None
+            self._db = None
+        self._pid = os.getpid()
+        self._health_checked_at = 0.0
+        self._collections_loaded_at = 0.0
+
+
+    def _reset_after_fork(self):
+        """子進程不能沿用父進程的 socket，丟棄舊 client，下次使用時再連接"""
+        self._client = None
+        self._db = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._health_checked_at = 0.0
+        self._collections_loaded_at = 0.0
+        self.pool_metrics = PoolMetricsListener()
+        self.connection_state = ConnectionStateTracker()
+
+
+    def _ensure_client(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._connect()
+
+
+    @property
+    def client(self):
+        self._ensure_client()
+        return self._client
+
+
+    @property
+    def db(self):
+        self._ensure_client()
+        return self._db
 
 
     #region Is Connected
     def is_connected(self):
         if not self.client:
             return False
+        # 優先使用監控事件的狀態，只有在還沒收到事件時才 ping
+        if self.connection_state.connected is not None:
+            return self.connection_state.connected
+        now = time.monotonic()
+        if now - self._health_checked_at < MONGO_HEALTH_TTL:
+            return self._healthy
         try:
             self.client.admin.command('ping')
-            return True
+            self._healthy = True
         except ConnectionFailure:
-            return False
+            self._healthy = False
+        self._health_checked_at = now
+        return self._healthy
+
+
+    #region Collection Cache
+    def has_collection(self, name):
+        """檢查集合是否存在，list_collection_names() 的結果會緩存 MONGO_COLLECTION_CACHE_TTL 秒"""
+        now = time.monotonic()
+        if now - self._collections_loaded_at >= MONGO_COLLECTION_CACHE_TTL:
+            try:
+                self._collections = set(self.db.list_collection_names())
+                self._collections_loaded_at = now
+            except Exception as e:
+                print(f"List collections error: {e}")
+                return False
+        return name in self._collections
+
+
+    def invalidate_collection_cache(self):
+        self._collections_loaded_at = 0.0
+
+
+    #region Pool Stats
+    def pool_stats(self):
+        """返回連接池統計數據"""
+        stats = self.pool_metrics.snapshot()
+        stats["max_pool_size"] = self.max_pool_size
+        stats["min_pool_size"] = self.min_pool_size
+        stats["pid"] = self._pid
+        stats["connected"] = self.connection_state.connected
+        return stats
 
 
     #region Find Collection
     def find_collection(self, name):
         if not self.is_connected():
             return False
-        collections = self.db.list_collection_names()
-        return True if name in collections else []
+        return True if self.has_collection(name) else []
 
 
     #region Create Collection
     def create_collection(self, name):
         if not self.is_connected():
             return False
-        if name not in self.db.list_collection_names():
+        if not self.has_collection(name):
             self.db.create_collection(name)
+            self.invalidate_collection_cache()
             return True
         return False
 
@@ -62,12 +428,18 @@ class MongoHandler:
     def create_doc(self, collection_name, doc):
         if not self.is_connected():
             return None
-        if collection_name not in self.db.list_collection_names():
+        if not self.has_collection(collection_name):
             return None
         try:
             # 加入今天日期
             doc["today_date"] = datetime.now(ZoneInfo("America/New_York")).strftime('%Y-%m-%d')
             result = self.db[collection_name].insert_one(doc)
+            if touches_catalog(collection_name):
+                self.db[TRADING_DATES_COLLECTION].update_one(
+                    {"_id": doc["today_date"]},
+                    trading_date_increment(doc, datetime.now(ZoneInfo("America/New_York"))),
+                    upsert=True
+                )
             return result.inserted_id
         except Exception as e:
             print(f"Insert error: {e}")
@@ -75,13 +447,13 @@ class MongoHandler:
 
 
     #region Find Document
-    def find_doc(self, collection_name, query):
+    def find_doc(self, collection_name, query, projection=None):
         if not self.is_connected():
             return []
-        if collection_name not in self.db.list_collection_names():
+        if not self.has_collection(collection_name):
             return []
         try:
-            return list(self.db[collection_name].find(query))
+            return list(self.db[collection_name].find(query, projection))
         except Exception as e:
             print(f"Find error: {e}")
             return []
@@ -91,33 +463,228 @@ class MongoHandler:
     def update_doc(self, collection_name, query, update):
         if not self.is_connected():
             return None
-        if collection_name not in self.db.list_collection_names():
+        if not self.has_collection(collection_name):
             return None
         try:
+            dates = self._catalog_dates(collection_name, query, update)
             result = self.db[collection_name].update_many(query, {'$set': update})
+            self.refresh_trading_dates(dates)
             return result.modified_count  # 回傳更新的筆數
         except Exception as e:
             print(f"Update error: {e}")
             return None
 
 
+    #region Aggregate
+    def aggregate(self, collection_name, pipeline):
+        if not self.is_connected():
+            return []
+        if not self.has_collection(collection_name):
+            return []
+        try:
+            return list(self.db[collection_name].aggregate(pipeline))
+        except Exception as e:
+            print(f"Aggregate error: {e}")
+            return []
+
+
+    #region Ensure Index
+    def ensure_index(self, collection_name, keys, **kwargs):
+        """建立索引 (已存在則不做任何事)"""
+        if not self.is_connected():
+            return None
+        try:
+            return self.db[collection_name].create_index(keys, **kwargs)
+        except Exception as e:
+            print(f"Create index error: {e}")
+            return None
+
+
+    #region Ensure Indexes
+    def ensure_indexes(self, registry=None):
+        """按 INDEX_REGISTRY 建立所有索引，返回 {collection: [index_name, ...]}"""
+        registry = registry or INDEX_REGISTRY
+        created = {}
+        for collection_name, index_list in registry.items():
+            names = [self.ensure_index(collection_name, keys) for keys in index_list]
+            created[collection_name] = [name for name in names if name]
+        return created
+
+
+    #region Index Report
+    def index_report(self, registry=None):
+        """比較 INDEX_REGISTRY 和數據庫中的索引
+
+        返回每個集合的 missing (已聲明但不存在)、undeclared (存在但未聲明)
+        和 unused ($indexStats 中 ops 為 0) 索引。
+        """
+        registry = registry or INDEX_REGISTRY
+        report = {}
+        if not self.is_connected():
+            return report
+        for collection_name, index_list in registry.items():
+            try:
+                collection = self.db[collection_name]
+                index_information = collection.index_information()
+                try:
+                    index_stats = list(collection.aggregate([{"$indexStats": {}}]))
+                except Exception as e:
+                    print(f"Index stats error: {e}")
+                    index_stats = []
+                report[collection_name] = build_index_report(index_list, index_information, index_stats)
+            except Exception as e:
+                print(f"Index report error: {e}")
+        return report
+
+
+    #region Trading Dates
+    def refresh_trading_dates(self, dates=None):
+        """重新統計 dates (None = 全部歷史) 並寫入 trading_dates，返回寫入的目錄條目
+
+        只掃描這些日期的文檔 (today_date 索引)，已經沒有數據的日期從目錄刪除。
+        """
+        if not self.is_connected():
+            return None
+        if dates is not None and not dates:
+            return []
+        try:
+            match = None if dates is None else {"today_date": {"$in": sorted(dates)}}
+            groups = self.db[CATALOG_SOURCE_COLLECTION].aggregate(trading_dates_pipeline(match), allowDiskUse=True)
+            entries, operations = trading_date_operations(groups, datetime.now(ZoneInfo("America/New_York")), dates)
+            if operations:
+                self.db[TRADING_DATES_COLLECTION].bulk_write(operations, ordered=False)
+            if dates is None:
+                self.invalidate_collection_cache()
+            return entries
+        except Exception as e:
+            print(f"Refresh trading dates error: {e}")
+            return None
+
+
+    def trading_dates(self, limit=None):
+        """trading_dates 中的日期 (由新到舊)，limit 為 None 時返回全部"""
+        if not self.is_connected():
+            return []
+        try:
+            cursor = self.db[TRADING_DATES_COLLECTION].find({}, {"_id": 0}).sort("_id", -1)
+            if limit:
+                cursor = cursor.limit(limit)
+            return list(cursor)
+        except Exception as e:
+            print(f"Trading dates error: {e}")
+            return []
+
+
+    def recent_trading_dates(self, n):
+        """最近 n 個有數據的交易日 (由新到舊，週末和假期沒有數據，自然被跳過)
+
+        直接對源集合的 today_date 做 distinct (走 today_date 索引，成本和日期數量成正比)，
+        不依賴 trading_dates 目錄 (目錄可能還沒回填，或者缺少其他程序寫入的日期)。
+        """
+        if not self.is_connected():
+            return []
+        try:
+            distinct = self.db[CATALOG_SOURCE_COLLECTION].distinct("today_date")
+            return sorted((date for date in distinct if isinstance(date, str)), reverse=True)[:n]
+        except Exception as e:
+            print(f"Recent trading dates error: {e}")
+            return []
+
+
+    def reconcile_trading_dates(self):
+        """補齊並清理 trading_dates (見 reconcile_dates)，返回重新統計後寫入的目錄條目
+
+        會寫入目錄，不要在讀取請求中調用: 由 API 的後台任務或 dev_test/backfill_trading_dates.py 執行。
+        """
+        if not self.is_connected():
+            return None
+        try:
+            source = self.db[CATALOG_SOURCE_COLLECTION].distinct("today_date")
+            catalog_ids = self.db[TRADING_DATES_COLLECTION].distinct("_id")
+        except Exception as e:
+            print(f"Reconcile trading dates error: {e}")
+            return None
+        return self.refresh_trading_dates(reconcile_dates(source, catalog_ids))
+
+
+    def _catalog_dates(self, collection_name, query, update=None, single=False, upsert=False):
+        """寫入源集合前: 找出這次寫入會影響 trading_dates 的哪些日期 (見 catalog_dates)
+
+        single 為 True 時只看 query 匹配的第一個文檔 (update_one / delete_one / upsert)。
+        """
+        if not touches_catalog(collection_name, update):
+            return set()
+        collection = self.db[collection_name]
+        try:
+            if single:
+                doc = collection.find_one(query, CATALOG_PROJECTION)
+                docs = [doc] if doc else []
+            elif update is None:
+                docs = [{"today_date": date} for date in collection.distinct("today_date", query)]
+            else:
+                docs = list(collection.find(query, CATALOG_PROJECTION))
+        except Exception as e:
+            print(f"Catalog dates error: {e}")
+            return set()
+        return catalog_dates(docs, update, upsert)
+
+
+    #region Cache Invalidations
+    def signal_symbol_change(self, symbol):
+        """記錄 symbol 的數據已被修改，其他進程 (API) 的響應緩存據此失效"""
+        if not self.is_connected():
+            return False
+        try:
+            self.db[CACHE_INVALIDATIONS_COLLECTION].update_one(
+                {"_id": symbol.upper()},
+                {"$currentDate": {"updated_at": True}},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            print(f"Signal symbol change error: {e}")
+            return False
+
+
+    def symbol_changes_since(self, since=None):
+        """since 之後被修改的股票代碼，返回 ([(symbol, updated_at), ...], 最新的 updated_at)
+
+        since 為 None 時只返回最新的 updated_at (作為輪詢的起點)。
+        """
+        if not self.is_connected():
+            return [], since
+        try:
+            collection = self.db[CACHE_INVALIDATIONS_COLLECTION]
+            if since is None:
+                latest = collection.find_one({}, sort=[("updated_at", -1)])
+                return [], latest["updated_at"] if latest else datetime(1970, 1, 1)
+            cursor = collection.find({"updated_at": {"$gt": since}})
+            changes = [(doc["_id"], doc["updated_at"]) for doc in cursor]
+            return changes, max([since] + [updated_at for _, updated_at in changes])
+        except Exception as e:
+            print(f"Symbol changes error: {e}")
+            return [], since
+
+
     #region Upsert Document
 
     def upsert_doc(self, collection_name, query_keys: dict, new_data: dict):
         if not self.is_connected():
             return None
-        if collection_name not in self.db.list_collection_names():
+        if not self.has_collection(collection_name):
             return None
 
         try:
             # 加入今天日期
             new_data["today_date"] = datetime.now(ZoneInfo("America/New_York")).strftime('%Y-%m-%d')
 
+            dates = self._catalog_dates(collection_name, query_keys, new_data, single=True, upsert=True)
             result = self.db[collection_name].update_one(
                 filter=query_keys,
                 update={"$set": new_data},
                 upsert=True
             )
+            self.refresh_trading_dates(dates)
             return {
                 "matched_count": result.matched_count,
                 "modified_count": result.modified_count,
@@ -131,7 +698,7 @@ class MongoHandler:
     def upsert_top_list(self, collection_name: str, new_symbols: list):
         if not self.is_connected():
             return None
-        if collection_name not in self.db.list_collection_names():
+        if not self.has_collection(collection_name):
             return None
 
         try:
@@ -169,10 +736,12 @@ class MongoHandler:
     def delete_doc(self, collection_name, query):
         if not self.is_connected():
             return None
-        if collection_name not in self.db.list_collection_names():
+        if not self.has_collection(collection_name):
             return None
         try:
+            dates = self._catalog_dates(collection_name, query)
             result = self.db[collection_name].delete_many(query)
+            self.refresh_trading_dates(dates)
             return result.deleted_count
         except Exception as e:
             print(f"Delete error: {e}")
@@ -180,32 +749,29 @@ class MongoHandler:
         
 
     #region Find One
-    def find_one(self, collection_name, query, projection=None):
-        print(f"Finding one in {collection_name} with query: {query}")
+    def find_one(self, collection_name, query, projection=None, sort=None):
         """查找单个文档"""
         if not self.is_connected():
             return None
-        if collection_name not in self.db.list_collection_names():
+        if not self.has_collection(collection_name):
             return None
         try:
-            if projection:
-                return self.db[collection_name].find_one(query, projection)
-            else:
-                return self.db[collection_name].find_one(query)
+            return self.db[collection_name].find_one(query, projection, sort=sort)
         except Exception as e:
             print(f"Find one error: {e}")
             return None
 
     #region Update One
     def update_one(self, collection_name, query, update):
-        print(f"Updating one in {collection_name} with query: {query} and update: {update}")
         """更新单个文档"""
         if not self.is_connected():
             return None
-        if collection_name not in self.db.list_collection_names():
+        if not self.has_collection(collection_name):
             return None
         try:
+            dates = self._catalog_dates(collection_name, query, update, single=True)
             result = self.db[collection_name].update_one(query, {'$set': update})
+            self.refresh_trading_dates(dates)
             return {
                 'matched_count': result.matched_count,
                 'modified_count': result.modified_count
@@ -218,10 +784,12 @@ class MongoHandler:
         """删除单个文档"""
         if not self.is_connected():
             return None
-        if collection_name not in self.db.list_collection_names():
+        if not self.has_collection(collection_name):
             return None
         try:
+            dates = self._catalog_dates(collection_name, query, single=True)
             result = self.db[collection_name].delete_one(query)
+            self.refresh_trading_dates(dates)
             return result.deleted_count
         except Exception as e:
             print(f"Delete one error: {e}")
@@ -231,7 +799,34 @@ class MongoHandler:
 
 
 
+#region Shared Handler
+_shared_handler = None
+_shared_lock = threading.Lock()
+
+
+def get_mongo_handler():
+    """返回進程內共用的 MongoHandler (共用同一個連接池)"""
+    global _shared_handler
+    if _shared_handler is None:
+        with _shared_lock:
+            if _shared_handler is None:
+                _shared_handler = MongoHandler()
+    return _shared_handler
+
+
+def _after_fork_in_child():
+    global _shared_lock
+    _shared_lock = threading.Lock()
+    if _shared_handler is not None:
+        _shared_handler._reset_after_fork()
+
+
+# gunicorn 等 pre-fork 服務器: 子進程重新建立自己的連接池
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
 if __name__ == "__main__":
-    mongo_handler = MongoHandler()
+    mongo_handler = get_mongo_handler()
     print(f"Document is found: {mongo_handler.find_doc('fundamentals_of_top_list_symbols', {'today_date': today_str})}")
     
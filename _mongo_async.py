@@ -0,0 +1,537 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from pymongo import AsyncMongoClient
+from pymongo.errors import ConnectionFailure
+
+from _mongo import (
+    CACHE_INVALIDATIONS_COLLECTION,
+    CATALOG_PROJECTION,
+    CATALOG_SOURCE_COLLECTION,
+    INDEX_REGISTRY,
+    MONGO_COLLECTION_CACHE_TTL,
+    MONGO_HEALTH_TTL,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    TRADING_DATES_COLLECTION,
+    ConnectionStateTracker,
+    PoolMetricsListener,
+    build_index_report,
+    catalog_dates,
+    reconcile_dates,
+    touches_catalog,
+    trading_date_increment,
+    trading_date_operations,
+    trading_dates_pipeline,
+)
+
+# MongoHandler 的異步版本 (pymongo AsyncMongoClient)，方法名稱和返回值與 _mongo.MongoHandler 相同，
+# 在 FastAPI 的 async 端點中使用，查詢時不會阻塞事件循環。
+# AsyncMongoClient 綁定在第一次使用它的事件循環上，所以 client 在循環內延遲建立，
+# 進程 (fork) 或事件循環改變時重新建立。
+
+
+class AsyncMongoHandler:
+
+    #region Constructor
+    def __init__(self, max_pool_size=None, min_pool_size=None):
+        self.max_pool_size = max_pool_size or MONGO_MAX_POOL_SIZE
+        self.min_pool_size = min_pool_size if min_pool_size is not None else MONGO_MIN_POOL_SIZE
+        self.pool_metrics = PoolMetricsListener()
+        self.connection_state = ConnectionStateTracker()
+        self._collections = set()
+        self._collections_loaded_at = 0.0
+        self._client = None
+        self._db = None
+        self._pid = None
+        self._loop = None
+        self._healthy = False
+        self._health_checked_at = 0.0
+
+
+    #region Connect
+    def _connect(self, loop):
+        try:
+            mongo_uri = os.getenv("MONGODB_CONNECTION_STRING")
+            self.pool_metrics = PoolMetricsListener()
+            self.connection_state = ConnectionStateTracker()
+            self._client = AsyncMongoClient(
+                mongo_uri,
+                serverSelectionTimeoutMS=3000,
+                maxPoolSize=self.max_pool_size,
+                minPoolSize=self.min_pool_size,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                event_listeners=[self.pool_metrics, self.connection_state],
+            )
+            self._db = self._client[os.getenv("MONGO_DBNAME", "TradeZero_Bot")]
+        except Exception as e:
+            print(f"Connection error: {e}")
+            self._client = None
+            self._db = None
+        self._pid = os.getpid()
+        self._loop = loop
+        self._health_checked_at = 0.0
+        self._collections_loaded_at = 0.0
+
+
+    def _ensure_client(self):
+        # 事件循環內沒有 await，不需要鎖
+        loop = asyncio.get_running_loop()
+        if self._pid != os.getpid() or self._loop is not loop:
+            self._connect(loop)
+
+
+    @property
+    def client(self):
+        self._ensure_client()
+        return self._client
+
+
+    @property
+    def db(self):
+        self._ensure_client()
+        return self._db
+
+
+    async def close(self):
+        if self._client is not None and self._pid == os.getpid():
+            await self._client.close()
+        self._client = None
+        self._db = None
+        self._pid = None
+        self._loop = None
+
+
+    #region Is Connected
+    async def is_connected(self):
+        if not self.client:
+            return False
+        if self.connection_state.connected is not None:
+            return self.connection_state.connected
+        now = time.monotonic()
+        if now - self._health_checked_at < MONGO_HEALTH_TTL:
+            return self._healthy
+        try:
+            await self.client.admin.command('ping')
+            self._healthy = True
+        except ConnectionFailure:
+            self._healthy = False
+        self._health_checked_at = now
+        return self._healthy
+
+
+    #region Collection Cache
+    async def has_collection(self, name):
+        """檢查集合是否存在，list_collection_names() 的結果會緩存 MONGO_COLLECTION_CACHE_TTL 秒"""
+        now = time.monotonic()
+        if now - self._collections_loaded_at >= MONGO_COLLECTION_CACHE_TTL:
+            try:
+                self._collections = set(await self.db.list_collection_names())
+                self._collections_loaded_at = now
+            except Exception as e:
+                print(f"List collections error: {e}")
+                return False
+        return name in self._collections
+
+
+    def invalidate_collection_cache(self):
+        self._collections_loaded_at = 0.0
+
+
+    #region Pool Stats
+    def pool_stats(self):
+        """返回連接池統計數據"""
+        stats = self.pool_metrics.snapshot()
+        stats["max_pool_size"] = self.max_pool_size
+        stats["min_pool_size"] = self.min_pool_size
+        stats["pid"] = self._pid
+        stats["connected"] = self.connection_state.connected
+        stats["driver"] = "async"
+        return stats
+
+
+    #region Find Collection
+    async def find_collection(self, name):
+        if not await self.is_connected():
+            return False
+        return True if await self.has_collection(name) else []
+
+
+    #region Create Collection
+    async def create_collection(self, name):
+        if not await self.is_connected():
+            return False
+        if not await self.has_collection(name):
+            await self.db.create_collection(name)
+            self.invalidate_collection_cache()
+            return True
+        return False
+
+
+    #region Create Document
+    async def create_doc(self, collection_name, doc):
+        if not await self.is_connected():
+            return None
+        if not await self.has_collection(collection_name):
+            return None
+        try:
+            doc["today_date"] = datetime.now(ZoneInfo("America/New_York")).strftime('%Y-%m-%d')
+            result = await self.db[collection_name].insert_one(doc)
+            if touches_catalog(collection_name):
+                await self.db[TRADING_DATES_COLLECTION].update_one(
+                    {"_id": doc["today_date"]},
+                    trading_date_increment(doc, datetime.now(ZoneInfo("America/New_York"))),
+                    upsert=True
+                )
+            return result.inserted_id
+        except Exception as e:
+            print(f"Insert error: {e}")
+            return None
+
+
+    #region Find Document
+    async def find_doc(self, collection_name, query, projection=None):
+        if not await self.is_connected():
+            return []
+        if not await self.has_collection(collection_name):
+            return []
+        try:
+            return await self.db[collection_name].find(query, projection).to_list()
+        except Exception as e:
+            print(f"Find error: {e}")
+            return []
+
+
+    #region Update Document
+    async def update_doc(self, collection_name, query, update):
+        if not await self.is_connected():
+            return None
+        if not await self.has_collection(collection_name):
+            return None
+        try:
+            dates = await self._catalog_dates(collection_name, query, update)
+            result = await self.db[collection_name].update_many(query, {'$set': update})
+            await self.refresh_trading_dates(dates)
+            return result.modified_count
+        except Exception as e:
+            print(f"Update error: {e}")
+            return None
+
+
+    #region Aggregate
+    async def aggregate(self, collection_name, pipeline):
+        if not await self.is_connected():
+            return []
+        if not await self.has_collection(collection_name):
+            return []
+        try:
+            cursor = await self.db[collection_name].aggregate(pipeline)
+            return await cursor.to_list()
+        except Exception as e:
+            print(f"Aggregate error: {e}")
+            return []
+
+
+    #region Ensure Index
+    async def ensure_index(self, collection_name, keys, **kwargs):
+        """建立索引 (已存在則不做任何事)"""
+        if not await self.is_connected():
+            return None
+        try:
+            return await self.db[collection_name].create_index(keys, **kwargs)
+        except Exception as e:
+            print(f"Create index error: {e}")
+            return None
+
+
+    #region Ensure Indexes
+    async def ensure_indexes(self, registry=None):
+        """按 INDEX_REGISTRY 建立所有索引，返回 {collection: [index_name, ...]}"""
+        registry = registry or INDEX_REGISTRY
+        created = {}
+        for collection_name, index_list in registry.items():
+            names = [await self.ensure_index(collection_name, keys) for keys in index_list]
+            created[collection_name] = [name for name in names if name]
+        return created
+
+
+    #region Index Report
+    async def index_report(self, registry=None):
+        """比較 INDEX_REGISTRY 和數據庫中的索引，見 MongoHandler.index_report"""
+        registry = registry or INDEX_REGISTRY
+        report = {}
+        if not await self.is_connected():
+            return report
+        for collection_name, index_list in registry.items():
+            try:
+                collection = self.db[collection_name]
+                index_information = await collection.index_information()
+                try:
+                    index_stats = await (await collection.aggregate([{"$indexStats": {}}])).to_list()
+                except Exception as e:
+                    print(f"Index stats error: {e}")
+                    index_stats = []
+                report[collection_name] = build_index_report(index_list, index_information, index_stats)
+            except Exception as e:
+                print(f"Index report error: {e}")
+        return report
+
+
+    #region Trading Dates
+    async def refresh_trading_dates(self, dates=None):
+        """重新統計 dates (None = 全部歷史) 並寫入 trading_dates，見 MongoHandler.refresh_trading_dates"""
+        if not await self.is_connected():
+            return None
+        if dates is not None and not dates:
+            return []
+        try:
+            match = None if dates is None else {"today_date": {"$in": sorted(dates)}}
+            cursor = await self.db[CATALOG_SOURCE_COLLECTION].aggregate(trading_dates_pipeline(match), allowDiskUse=True)
+            entries, operations = trading_date_operations(
+                await cursor.to_list(), datetime.now(ZoneInfo("America/New_York")), dates
+            )
+            if operations:
+                await self.db[TRADING_DATES_COLLECTION].bulk_write(operations, ordered=False)
+            if dates is None:
+                self.invalidate_collection_cache()
+            return entries
+        except Exception as e:
+            print(f"Refresh trading dates error: {e}")
+            return None
+
+
+    async def trading_dates(self, limit=None):
+        """trading_dates 中的日期 (由新到舊)，limit 為 None 時返回全部"""
+        if not await self.is_connected():
+            return []
+        try:
+            cursor = self.db[TRADING_DATES_COLLECTION].find({}, {"_id": 0}).sort("_id", -1)
+            if limit:
+                cursor = cursor.limit(limit)
+            return await cursor.to_list()
+        except Exception as e:
+            print(f"Trading dates error: {e}")
+            return []
+
+
+    async def recent_trading_dates(self, n):
+        """最近 n 個有數據的交易日 (由新到舊)，見 MongoHandler.recent_trading_dates"""
+        if not await self.is_connected():
+            return []
+        try:
+            distinct = await self.db[CATALOG_SOURCE_COLLECTION].distinct("today_date")
+            return sorted((date for date in distinct if isinstance(date, str)), reverse=True)[:n]
+        except Exception as e:
+            print(f"Recent trading dates error: {e}")
+            return []
+
+
+    async def reconcile_trading_dates(self):
+        """補齊並清理 trading_dates，見 MongoHandler.reconcile_trading_dates (不要在讀取請求中調用)"""
+        if not await self.is_connected():
+            return None
+        try:
+            source = await self.db[CATALOG_SOURCE_COLLECTION].distinct("today_date")
+            catalog_ids = await self.db[TRADING_DATES_COLLECTION].distinct("_id")
+        except Exception as e:
+            print(f"Reconcile trading dates error: {e}")
+            return None
+        return await self.refresh_trading_dates(reconcile_dates(source, catalog_ids))
+
+
+    async def _catalog_dates(self, collection_name, query, update=None, single=False, upsert=False):
+        """寫入源集合前: 找出這次寫入會影響 trading_dates 的哪些日期，見 MongoHandler._catalog_dates"""
+        if not touches_catalog(collection_name, update):
+            return set()
+        collection = self.db[collection_name]
+        try:
+            if single:
+                doc = await collection.find_one(query, CATALOG_PROJECTION)
+                docs = [doc] if doc else []
+            elif update is None:
+                docs = [{"today_date": date} for date in await collection.distinct("today_date", query)]
+            else:
+                docs = await collection.find(query, CATALOG_PROJECTION).to_list()
+        except Exception as e:
+            print(f"Catalog dates error: {e}")
+            return set()
+        return catalog_dates(docs, update, upsert)
+
+
+    #region Cache Invalidations
+    async def signal_symbol_change(self, symbol):
+        """記錄 symbol 的數據已被修改，其他進程 (API) 的響應緩存據此失效"""
+        if not await self.is_connected():
+            return False
+        try:
+            await self.db[CACHE_INVALIDATIONS_COLLECTION].update_one(
+                {"_id": symbol.upper()},
+                {"$currentDate": {"updated_at": True}},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            print(f"Signal symbol change error: {e}")
+            return False
+
+
+    async def symbol_changes_since(self, since=None):
+        """since 之後被修改的股票代碼，返回 ([(symbol, updated_at), ...], 最新的 updated_at)
+
+        since 為 None 時只返回最新的 updated_at (作為輪詢的起點)。
+        """
+        if not await self.is_connected():
+            return [], since
+        try:
+            collection = self.db[CACHE_INVALIDATIONS_COLLECTION]
+            if since is None:
+                latest = await collection.find_one({}, sort=[("updated_at", -1)])
+                return [], latest["updated_at"] if latest else datetime(1970, 1, 1)
+            cursor = collection.find({"updated_at": {"$gt": since}})
+            changes = [(doc["_id"], doc["updated_at"]) for doc in await cursor.to_list()]
+            return changes, max([since] + [updated_at for _, updated_at in changes])
+        except Exception as e:
+            print(f"Symbol changes error: {e}")
+            return [], since
+
+
+    #region Upsert Document
+    async def upsert_doc(self, collection_name, query_keys: dict, new_data: dict):
+        if not await self.is_connected():
+            return None
+        if not await self.has_collection(collection_name):
+            return None
+        try:
+            new_data["today_date"] = datetime.now(ZoneInfo("America/New_York")).strftime('%Y-%m-%d')
+            dates = await self._catalog_dates(collection_name, query_keys, new_data, single=True, upsert=True)
+            result = await self.db[collection_name].update_one(
+                filter=query_keys,
+                update={"$set": new_data},
+                upsert=True
+            )
+            await self.refresh_trading_dates(dates)
+            return {
+                "matched_count": result.matched_count,
+                "modified_count": result.modified_count,
+                "upserted_id": str(result.upserted_id) if result.upserted_id else None
+            }
+        except Exception as e:
+            print(f"Upsert error: {e}")
+            return None
+
+
+    #region Upsert Top List
+    async def upsert_top_list(self, collection_name: str, new_symbols: list):
+        if not await self.is_connected():
+            return None
+        if not await self.has_collection(collection_name):
+            return None
+        try:
+            today_str = datetime.now(ZoneInfo("America/New_York")).strftime('%Y-%m-%d')
+            query = {"today_date": today_str}
+
+            existing_doc = await self.db[collection_name].find_one(query)
+            if existing_doc and "top_list" in existing_doc:
+                combined_list = list(set(existing_doc["top_list"] + new_symbols))
+            else:
+                combined_list = new_symbols
+
+            result = await self.db[collection_name].update_one(
+                filter=query,
+                update={"$set": {
+                    "today_date": today_str,
+                    "top_list": combined_list
+                }},
+                upsert=True
+            )
+            return {
+                "matched_count": result.matched_count,
+                "modified_count": result.modified_count,
+                "upserted_id": str(result.upserted_id) if result.upserted_id else None
+            }
+        except Exception as e:
+            print(f"Upsert error: {e}")
+            return None
+
+
+    #region Delete Document
+    async def delete_doc(self, collection_name, query):
+        if not await self.is_connected():
+            return None
+        if not await self.has_collection(collection_name):
+            return None
+        try:
+            dates = await self._catalog_dates(collection_name, query)
+            result = await self.db[collection_name].delete_many(query)
+            await self.refresh_trading_dates(dates)
+            return result.deleted_count
+        except Exception as e:
+            print(f"Delete error: {e}")
+            return None
+
+
+    #region Find One
+    async def find_one(self, collection_name, query, projection=None, sort=None):
+        """查找单个文档"""
+        if not await self.is_connected():
+            return None
+        if not await self.has_collection(collection_name):
+            return None
+        try:
+            return await self.db[collection_name].find_one(query, projection, sort=sort)
+        except Exception as e:
+            print(f"Find one error: {e}")
+            return None
+
+
+    #region Update One
+    async def update_one(self, collection_name, query, update):
+        """更新单个文档"""
+        if not await self.is_connected():
+            return None
+        if not await self.has_collection(collection_name):
+            return None
+        try:
+            dates = await self._catalog_dates(collection_name, query, update, single=True)
+            result = await self.db[collection_name].update_one(query, {'$set': update})
+            await self.refresh_trading_dates(dates)
+            return {
+                'matched_count': result.matched_count,
+                'modified_count': result.modified_count
+            }
+        except Exception as e:
+            print(f"Update one error: {e}")
+            return None
+
+
+    #region Delete One
+    async def delete_one(self, collection_name, query):
+        """删除单个文档"""
+        if not await self.is_connected():
+            return None
+        if not await self.has_collection(collection_name):
+            return None
+        try:
+            dates = await self._catalog_dates(collection_name, query, single=True)
+            result = await self.db[collection_name].delete_one(query)
+            await self.refresh_trading_dates(dates)
+            return result.deleted_count
+        except Exception as e:
+            print(f"Delete one error: {e}")
+            return None
+
+
+#region Shared Handler
+_shared_handler = None
+
+
+def get_async_mongo_handler():
+    """返回進程內共用的 AsyncMongoHandler (client 在事件循環內第一次使用時建立)"""
+    global _shared_handler
+    if _shared_handler is None:
+        _shared_handler = AsyncMongoHandler()
+    return _shared_handler
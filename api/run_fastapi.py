@@ -1,23 +1,39 @@
 import sys
 import os
+import asyncio
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 
 from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from typing import Optional, List, Dict, Any
 import uvicorn
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import json
-from bson import json_util
 from bson import ObjectId
 
 # 導入您的 MongoHandler
-from _mongo import MongoHandler  # 假設您的文件名為 paste.py
+from _mongo import get_mongo_handler
+from _mongo_async import get_async_mongo_handler
 
 # 導入新創建的實用工具
-from api.services.fastapi_utils import format_market_cap, prepare_tvlwc_data, filter_chart_data
+from api.services.fastapi_utils import (
+    ANALYSIS_FIELDS,
+    CHART_FIELDS,
+    PRICE_OVERVIEW_FIELDS,
+    build_analysis,
+    build_fundamentals,
+    build_price_overview,
+    format_market_cap,
+    prepare_chart_payload,
+)
+from api.services.mongo_json import MongoJSONResponse
+from api.services.compression import CompressionMiddleware
+from api.services.etag import ETagMiddleware
+from api.services.pagination import decode_cursor, keyset_page, keyset_pipeline
+from api.services.response_cache import ResponseCache, cached_endpoint, watch_invalidations
+from utils.timeframes import TIMEFRAMES, chart_window_pipeline, window_expr
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
@@ -28,7 +44,9 @@ from tz_api.api_news_fetcher import Summarizer
 app = FastAPI(
     title="股票數據 API",
     description="快速查詢 TradeZero_Bot 數據庫中的股票基本面數據",
-    version="1.0.0"
+    version="1.0.0",
+    # MongoDB 文檔直接一次編碼 (ObjectId / datetime / Decimal128)，可選 orjson 加速
+    default_response_class=MongoJSONResponse
 )
 
 # 添加 CORS 中間件
@@ -40,6 +58,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# JSON 響應加上 ETag，If-None-Match 相同時返回 304
+app.add_middleware(ETagMiddleware)
+# 最外層: 壓縮大於 COMPRESS_MIN_SIZE 的響應 (br / gzip)，ETag 按未壓縮的內容計算
+app.add_middleware(CompressionMiddleware)
+
 # 掛載靜態文件目錄
 app.mount("/assets", StaticFiles(directory="assets"), name="assets")
 
@@ -135,12 +158,100 @@ async def get_strategy_detail(strategy_name: str):
     
 
 
-# 初始化 MongoDB 連接
-mongo_handler = MongoHandler()
-
-def serialize_mongo_data(data):
-    """將 MongoDB 數據序列化為 JSON 可讀格式"""
-    return json.loads(json_util.dumps(data))
+# 初始化 MongoDB 連接 (異步 driver，查詢時不阻塞事件循環；進程內共用連接池)
+mongo_handler = get_async_mongo_handler()
+
+# 只讀端點的響應緩存 (過去日期長 TTL，今天短 TTL，新聞變更時按股票代碼失效)
+response_cache = ResponseCache()
+# 每個日期的股票總數 (分頁元數據) 和最新交易日指針，TTL 規則同上
+metadata_cache = ResponseCache(max_entries=256)
+
+# 列表端點 (/stocks/, latest_day, by_date) 返回的字段
+STOCK_LIST_PROJECTION = {
+    "symbol": 1,
+    "name": 1,
+    "day_close": 1,
+    "yesterday_close": 1,
+    "close_change_percentage": 1,
+    "high_change_percentage": 1,
+    "day_high": 1,
+    "day_low": 1,
+    "today_date": 1,
+    "float_risk": 1,
+    "short_signal": 1,
+    "sector": 1
+}
+
+# /stocks/{symbol}... 沒有指定日期時取最新的一天 ((symbol, today_date) 索引)
+LATEST_FIRST = [("today_date", -1)]
+
+# 後台補齊 trading_dates 目錄的間隔 (秒)
+TRADING_DATES_RECONCILE_INTERVAL = float(os.getenv("TRADING_DATES_RECONCILE_INTERVAL", "300"))
+
+def parse_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="cursor 格式無效")
+
+async def latest_trading_date(refresh=False):
+    """最新交易日 (按 today_date 索引查一次，之後緩存 API_CACHE_TTL_TODAY 秒)"""
+    key = ("latest_date",)
+    latest_date = None if refresh else metadata_cache.get(key)
+    if latest_date is None:
+        latest_entry = await mongo_handler.db["fundamentals_of_top_list_symbols"].find_one(
+            sort=[("today_date", -1)],
+            projection={"today_date": 1}
+        )
+        if not latest_entry or "today_date" not in latest_entry:
+            return None
+        latest_date = latest_entry["today_date"]
+        metadata_cache.set(key, latest_date, metadata_cache.ttl_today)
+    return latest_date
+
+async def count_for_date(date):
+    """某個日期的股票總數 (緩存，不用每一頁都 count_documents)"""
+    key = ("count", date)
+    total = metadata_cache.get(key)
+    if total is None:
+        total = await mongo_handler.db["fundamentals_of_top_list_symbols"].count_documents({"today_date": date})
+        metadata_cache.set(key, total, metadata_cache.ttl_for_date(date))
+    return total
+
+@app.on_event("startup")
+async def ensure_indexes():
+    """啟動時建立 INDEX_REGISTRY 中聲明的索引，並報告缺失的索引"""
+    await mongo_handler.ensure_indexes()
+    for collection_name, report in (await mongo_handler.index_report()).items():
+        if report["missing"]:
+            print(f"警告: {collection_name} 缺少索引 {report['missing']}")
+
+@app.on_event("startup")
+async def start_invalidation_watcher():
+    """後台輪詢其他進程 (Dash 新聞回調等) 發出的失效信號"""
+    app.state.invalidation_task = asyncio.create_task(watch_invalidations([response_cache], mongo_handler))
+
+async def reconcile_trading_dates_periodically(interval):
+    """定時補齊 trading_dates 目錄 (bot 等其他程序的寫入不經過 AsyncMongoHandler)"""
+    while True:
+        entries = await mongo_handler.reconcile_trading_dates()
+        if entries:
+            response_cache.invalidate("available_dates")
+        await asyncio.sleep(interval)
+
+@app.on_event("startup")
+async def start_trading_dates_reconciler():
+    app.state.reconcile_task = asyncio.create_task(reconcile_trading_dates_periodically(TRADING_DATES_RECONCILE_INTERVAL))
+
+@app.on_event("shutdown")
+async def close_mongo():
+    for name in ("invalidation_task", "reconcile_task"):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
+    await mongo_handler.close()
 
 @app.get("/")
 async def root():
@@ -162,20 +273,24 @@ async def root():
 @app.get("/health")
 async def health_check():
     """健康檢查端點"""
-    db_status = mongo_handler.is_connected()
+    db_status = await mongo_handler.is_connected()
     return {
         "status": "healthy" if db_status else "unhealthy",
         "database": "connected" if db_status else "disconnected",
+        "pool": mongo_handler.pool_stats(),
+        "cache": response_cache.stats(),
+        "metadata_cache": metadata_cache.stats(),
         "timestamp": datetime.now(ZoneInfo("America/New_York")).isoformat()
     }
 
 @app.get("/stocks/{symbol}")
+@cached_endpoint(response_cache, "stock")
 async def get_stock_by_symbol(
     symbol: str,
     date: Optional[str] = Query(None, description="日期格式: YYYY-MM-DD")
 ):
     """根據股票代碼查詢詳細信息 (已增強)"""
-    if not mongo_handler.is_connected():
+    if not await mongo_handler.is_connected():
         raise HTTPException(status_code=503, detail="數據庫連接失敗")
     
     query = {"symbol": symbol.upper()}
@@ -183,26 +298,26 @@ async def get_stock_by_symbol(
         query["today_date"] = date
     
     try:
-        result = mongo_handler.find_one("fundamentals_of_top_list_symbols", query)
+        result = await mongo_handler.find_one("fundamentals_of_top_list_symbols", query, sort=LATEST_FIRST)
         if not result:
             raise HTTPException(status_code=404, detail=f"找不到股票代碼 {symbol} 的數據")
         
         # Add formatted market cap
-        serialized_result = serialize_mongo_data(result)
         market_cap_float = result.get('market_cap_float')
-        serialized_result['market_cap_formatted'] = format_market_cap(market_cap_float)
+        result['market_cap_formatted'] = format_market_cap(market_cap_float)
 
-        return JSONResponse(content=serialized_result)
+        return MongoJSONResponse(content=result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查詢錯誤: {str(e)}")
     
 @app.get("/stocks/{symbol}/fundamentals")
+@cached_endpoint(response_cache, "fundamentals")
 async def get_stock_fundamentals(
     symbol: str,
     date: Optional[str] = Query(None, description="日期格式: YYYY-MM-DD")
 ):
     """獲取股票基本面數據 (不包含圖表數據)"""
-    if not mongo_handler.is_connected():
+    if not await mongo_handler.is_connected():
         raise HTTPException(status_code=503, detail="數據庫連接失敗")
     
     query = {"symbol": symbol.upper()}
@@ -216,18 +331,13 @@ async def get_stock_fundamentals(
             "1m_chart_data": 0,
             "5m_chart_data": 0
         }
-        result = mongo_handler.find_one("fundamentals_of_top_list_symbols", query, projection)
+        result = await mongo_handler.find_one("fundamentals_of_top_list_symbols", query, projection, sort=LATEST_FIRST)
         
         if not result:
             raise HTTPException(status_code=404, detail=f"找不到股票代碼 {symbol} 的數據")
         
-        # 序列化並格式化市值
-        serialized_result = serialize_mongo_data(result)
-        market_cap_float = result.get('market_cap_float')
-        if market_cap_float:
-            serialized_result['market_cap_formatted'] = format_market_cap(market_cap_float)
-        
-        return JSONResponse(content=serialized_result)
+        # 格式化市值
+        return MongoJSONResponse(content=build_fundamentals(result))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查詢錯誤: {str(e)}")
@@ -236,95 +346,90 @@ async def get_stock_fundamentals(
 async def get_stocks(
     date: Optional[str] = Query(None, description="日期格式: YYYY-MM-DD"),
     limit: int = Query(50, ge=1, le=500, description="返回結果數量限制"),
-    skip: int = Query(0, ge=0, description="跳過的結果數量")
+    skip: int = Query(0, ge=0, description="跳過的結果數量 (建議改用 cursor)"),
+    cursor: Optional[str] = Query(None, description="上一頁返回的 next_cursor")
 ):
-    """查詢股票列表，可根據日期篩選"""
-    if not mongo_handler.is_connected():
+    """查詢股票列表，可根據日期篩選 (按日期、漲幅由大到小排序)"""
+    if not await mongo_handler.is_connected():
         raise HTTPException(status_code=503, detail="數據庫連接失敗")
     
     query = {}
     if date:
         query["today_date"] = date
+    page_cursor = parse_cursor(cursor)
     
     try:
-        # 使用 MongoDB 的聚合管道來實現分頁
-        pipeline = [
-            {"$match": query},
-            {"$skip": skip},
-            {"$limit": limit},
-            {"$project": {
-                "symbol": 1,
-                "name": 1,
-                "day_close": 1,
-                "yesterday_close": 1,
-                "close_change_percentage": 1,
-                "high_change_percentage": 1,
-                "day_high": 1,
-                "day_low": 1,
-                "today_date": 1,
-                "float_risk": 1,
-                "short_signal": 1,
-                "sector":1
-            }}
-        ]
+        # Keyset 分頁: 有 cursor 時從上一頁最後一條之後開始，不用 $skip
+        pipeline = keyset_pipeline(query, page_cursor, limit, STOCK_LIST_PROJECTION, skip)
         
         collection = mongo_handler.db["fundamentals_of_top_list_symbols"]
-        results = list(collection.aggregate(pipeline))
+        results = await (await collection.aggregate(pipeline)).to_list()
+        results, next_cursor = keyset_page(results, limit)
         
-        return JSONResponse(content={
+        return MongoJSONResponse(content={
             "count": len(results),
-            "data": serialize_mongo_data(results)
+            "next_cursor": next_cursor,
+            "data": results
         })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查詢錯誤: {str(e)}")
 
 @app.get("/stocks/{symbol}/chart")
+@cached_endpoint(response_cache, "chart")
 async def get_stock_chart(
     symbol: str,
     timeframe: str = Query("1d", description="時間框架: 1m, 5m, 1d"),
-    date: Optional[str] = Query(None, description="日期格式: YYYY-MM-DD")
+    date: Optional[str] = Query(None, description="日期格式: YYYY-MM-DD"),
+    format: str = Query("rows", description="數據格式: rows (每根 K 線一個對象) 或 columnar (列式數組)")
 ):
     """獲取股票圖表數據 (已增強，返回 Tvlwc 格式數據)"""
-    if not mongo_handler.is_connected():
+    if not await mongo_handler.is_connected():
         raise HTTPException(status_code=503, detail="數據庫連接失敗")
     
-    if timeframe not in ["1m", "5m", "1d"]:
+    if timeframe not in TIMEFRAMES:
         raise HTTPException(status_code=400, detail="時間框架必須是 1m, 5m, 或 1d")
+
+    if format not in ["rows", "columnar"]:
+        raise HTTPException(status_code=400, detail="數據格式必須是 rows 或 columnar")
     
     query = {"symbol": symbol.upper()}
     if date:
         query["today_date"] = date
     
     try:
-        result = mongo_handler.find_one("fundamentals_of_top_list_symbols", query)
+        # 只取所需時間框架的 K 線，並在數據庫端截取窗口 ($filter / $slice)
+        pipeline = chart_window_pipeline(query, [timeframe], fields=["symbol", "today_date"])
+        results = await mongo_handler.aggregate("fundamentals_of_top_list_symbols", pipeline)
+        result = results[0] if results else None
         if not result:
             raise HTTPException(status_code=404, detail=f"找不到股票代碼 {symbol} 的數據")
         
-        chart_field = f"{timeframe}_chart_data"
+        chart_field = TIMEFRAMES[timeframe]["field"]
         raw_chart_data = result.get(chart_field, [])
 
-        # Filter the chart data based on timeframe (e.g., last 3 hours for 1m, latest day for 5m/1d)
-        filtered_chart_data = filter_chart_data(raw_chart_data, timeframe)
-        
-        # Prepare data for dash_tvlwc component (Unix timestamp for time)
-        tvlwc_chart_data = prepare_tvlwc_data(filtered_chart_data)
+        # Filter the chart data based on timeframe (last 3 hours for 1m, latest session for 5m, last 30 days for 1d)
+        # and prepare it for the dash_tvlwc component, parsing the bars only once
+        tvlwc_chart_data = prepare_chart_payload(raw_chart_data, timeframe, format)
+        data_points = len(tvlwc_chart_data["t"]) if format == "columnar" else len(tvlwc_chart_data)
         
-        return JSONResponse(content={
+        return MongoJSONResponse(content={
             "symbol": symbol.upper(),
             "timeframe": timeframe,
-            "data_points": len(tvlwc_chart_data),
+            "format": format,
+            "data_points": data_points,
             "chart_data": tvlwc_chart_data # Return processed data
         })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查詢錯誤: {str(e)}")
 
 @app.get("/stocks/{symbol}/price-overview")
+@cached_endpoint(response_cache, "price_overview")
 async def get_stock_price_overview(
     symbol: str,
     date: Optional[str] = Query(None, description="日期格式: YYYY-MM-DD")
 ):
     """獲取股票價格概覽數據 (新增)"""
-    if not mongo_handler.is_connected():
+    if not await mongo_handler.is_connected():
         raise HTTPException(status_code=503, detail="數據庫連接失敗")
     
     query = {"symbol": symbol.upper()}
@@ -332,35 +437,134 @@ async def get_stock_price_overview(
         query["today_date"] = date
     
     try:
-        result = mongo_handler.find_one("fundamentals_of_top_list_symbols", query)
+        result = await mongo_handler.find_one("fundamentals_of_top_list_symbols", query, sort=LATEST_FIRST)
         if not result:
             raise HTTPException(status_code=404, detail=f"找不到股票代碼 {symbol} 的數據")
         
         # Extract and organize relevant price points and key levels
-        price_overview_data = {
-            "symbol": result.get("symbol"),
-            "yesterday_close": result.get("yesterday_close"),
-            "day_low": result.get("day_low"),
-            "day_high": result.get("day_high"),
-            "day_close": result.get("day_close"),
-            "market_open_high": result.get("market_open_high"),
-            "market_open_low": result.get("market_open_low"),
-            "key_levels": result.get("key_levels", [])
-        }
+        price_overview_data = build_price_overview(result)
         
-        return JSONResponse(content=serialize_mongo_data(price_overview_data))
+        return MongoJSONResponse(content=price_overview_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查詢錯誤: {str(e)}")
+
+
+# 批量查詢 (watchlist): 一次 $in 查詢取回所有股票，每個股票返回所需的部分
+BATCH_MAX_SYMBOLS = 100
+BATCH_PARTS = ("fundamentals", "analysis", "price_overview", "chart")
+
+class BatchRequest(BaseModel):
+    symbols: List[str]
+    date: Optional[str] = None  # 不指定時每個股票取最新日期
+    fields: List[str] = ["fundamentals"]  # fundamentals / analysis / price_overview / chart
+    timeframe: str = "1d"  # fields 包含 chart 時使用
+    format: str = "rows"  # chart 的格式: rows 或 columnar
+
+def batch_pipeline(symbols, date, fields, timeframe):
+    query = {"symbol": {"$in": symbols}}
+    if date:
+        query["today_date"] = date
+    # 只保留需要的字段；不需要的 K 線字段在分組之前就去掉
+    if "fundamentals" in fields:
+        projection = {field: 0 for field in CHART_FIELDS}
+        if "chart" in fields:
+            projection.pop(TIMEFRAMES[timeframe]["field"])
+    else:
+        keep = {"symbol", "today_date"}
+        if "analysis" in fields:
+            keep.update(ANALYSIS_FIELDS)
+        if "price_overview" in fields:
+            keep.update(PRICE_OVERVIEW_FIELDS)
+        if "chart" in fields:
+            keep.add(TIMEFRAMES[timeframe]["field"])
+        projection = {field: 1 for field in sorted(keep)}
+    pipeline = [
+        {"$match": query},
+        # (symbol, today_date) 索引: 每個股票最新的一條排在最前
+        {"$sort": {"symbol": 1, "today_date": -1}},
+        {"$project": projection},
+        {"$group": {"_id": "$symbol", "doc": {"$first": "$$ROOT"}}},
+        {"$replaceRoot": {"newRoot": "$doc"}},
+    ]
+    if "chart" in fields:
+        field = TIMEFRAMES[timeframe]["field"]
+        pipeline.append({"$addFields": {field: window_expr(timeframe)}})
+    return pipeline
+
+def batch_entry(result, fields, timeframe, format):
+    entry = {"today_date": result.get("today_date")}
+    if "fundamentals" in fields:
+        entry["fundamentals"] = build_fundamentals(result)
+    if "analysis" in fields:
+        entry["analysis"] = build_analysis(result)
+    if "price_overview" in fields:
+        entry["price_overview"] = build_price_overview(result)
+    if "chart" in fields:
+        chart_data = prepare_chart_payload(result.get(TIMEFRAMES[timeframe]["field"], []), timeframe, format)
+        entry["chart"] = {
+            "timeframe": timeframe,
+            "format": format,
+            "data_points": len(chart_data["t"]) if format == "columnar" else len(chart_data),
+            "chart_data": chart_data
+        }
+    return entry
+
+@app.post("/stocks/batch")
+async def get_stocks_batch(request: BatchRequest):
+    """批量查詢多個股票，返回 {symbol: {...}}；單個股票找不到或出錯時只在該股票返回 error"""
+    if not await mongo_handler.is_connected():
+        raise HTTPException(status_code=503, detail="數據庫連接失敗")
+
+    symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in request.symbols if symbol.strip()))
+    if not symbols:
+        raise HTTPException(status_code=400, detail="symbols 不能為空")
+    if len(symbols) > BATCH_MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"一次最多查詢 {BATCH_MAX_SYMBOLS} 個股票")
+    fields = list(dict.fromkeys(request.fields))
+    unknown = [field for field in fields if field not in BATCH_PARTS]
+    if not fields or unknown:
+        raise HTTPException(status_code=400, detail=f"fields 必須是 {', '.join(BATCH_PARTS)} 之一")
+    if "chart" in fields and request.timeframe not in TIMEFRAMES:
+        raise HTTPException(status_code=400, detail="時間框架必須是 1m, 5m, 或 1d")
+    if request.format not in ["rows", "columnar"]:
+        raise HTTPException(status_code=400, detail="數據格式必須是 rows 或 columnar")
+
+    try:
+        pipeline = batch_pipeline(symbols, request.date, fields, request.timeframe)
+        collection = mongo_handler.db["fundamentals_of_top_list_symbols"]
+        results = await (await collection.aggregate(pipeline)).to_list()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查詢錯誤: {str(e)}")
 
+    found = {result["symbol"]: result for result in results}
+    data = {}
+    for symbol in symbols:
+        result = found.get(symbol)
+        if result is None:
+            data[symbol] = {"error": "not_found", "detail": f"找不到股票代碼 {symbol} 的數據"}
+            continue
+        try:
+            data[symbol] = batch_entry(result, fields, request.timeframe, request.format)
+        except Exception as e:
+            data[symbol] = {"error": "processing_error", "detail": str(e)}
+
+    return MongoJSONResponse(content={
+        "date": request.date,
+        "fields": fields,
+        "count": len(found),
+        "errors": len(symbols) - sum(1 for entry in data.values() if "error" not in entry),
+        "data": data
+    })
 
 @app.get("/top-movers")
+@cached_endpoint(response_cache, "top_movers")
 async def get_top_movers(
     date: Optional[str] = Query(None, description="日期格式: YYYY-MM-DD"),
     limit: int = Query(10, ge=1, le=50, description="返回結果數量"),
     sort_by: str = Query("close_change_percentage", description="排序字段: close_change_percentage 或 high_change_percentage")
 ):
     """獲取漲跌幅最大的股票"""
-    if not mongo_handler.is_connected():
+    if not await mongo_handler.is_connected():
         raise HTTPException(status_code=503, detail="數據庫連接失敗")
     
     if sort_by not in ["close_change_percentage", "high_change_percentage"]:
@@ -391,23 +595,24 @@ async def get_top_movers(
         ]
         
         collection = mongo_handler.db["fundamentals_of_top_list_symbols"]
-        results = list(collection.aggregate(pipeline))
+        results = await (await collection.aggregate(pipeline)).to_list()
         
-        return JSONResponse(content={
+        return MongoJSONResponse(content={
             "sorted_by": sort_by,
             "count": len(results),
-            "data": serialize_mongo_data(results)
+            "data": results
         })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查詢錯誤: {str(e)}")
 
 @app.get("/stocks/{symbol}/analysis")
+@cached_endpoint(response_cache, "analysis")
 async def get_stock_analysis(
     symbol: str,
     date: Optional[str] = Query(None, description="日期格式: YYYY-MM-DD")
 ):
     """獲取股票分析和建議 (已增強，包含現金和債務百萬值)"""
-    if not mongo_handler.is_connected():
+    if not await mongo_handler.is_connected():
         raise HTTPException(status_code=503, detail="數據庫連接失敗")
     
     query = {"symbol": symbol.upper()}
@@ -415,32 +620,14 @@ async def get_stock_analysis(
         query["today_date"] = date
     
     try:
-        result = mongo_handler.find_one("fundamentals_of_top_list_symbols", query)
+        result = await mongo_handler.find_one("fundamentals_of_top_list_symbols", query, sort=LATEST_FIRST)
         if not result:
             raise HTTPException(status_code=404, detail=f"找不到股票代碼 {symbol} 的數據")
         
         # Calculate cash and debt in millions
-        cash = result.get("cash")
-        debt = result.get("debt")
-        
-        cash_in_millions = float(cash / 1_000_000) if cash is not None else None
-        debt_in_millions = float(debt / 1_000_000) if debt is not None else None
-
-        analysis_data = {
-            "symbol": result.get("symbol"),
-            "suggestion": result.get("suggestion"),
-            "sec_filing_analysis": result.get("sec_filing_analysis"),
-            "key_levels": result.get("key_levels"),
-            "float_risk": result.get("float_risk"),
-            "short_signal": result.get("short_signal"),
-            "hype_score": result.get("hype_score"),
-            "squeeze_score": result.get("squeeze_score"),
-            "atm_urgency": result.get("atm_urgency"),
-            "cash_in_millions": cash_in_millions,  # Added
-            "debt_in_millions": debt_in_millions   # Added
-        }
+        analysis_data = build_analysis(result)
         
-        return JSONResponse(content=serialize_mongo_data(analysis_data))
+        return MongoJSONResponse(content=analysis_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查詢錯誤: {str(e)}")
 
@@ -450,7 +637,7 @@ async def get_stock_news(
     date: Optional[str] = Query(None, description="日期格式: YYYY-MM-DD")
 ):
     """獲取指定股票的新聞"""
-    if not mongo_handler.is_connected():
+    if not await mongo_handler.is_connected():
         raise HTTPException(status_code=503, detail="數據庫連接失敗")
 
     query = {"symbol": symbol.upper()}
@@ -465,16 +652,16 @@ async def get_stock_news(
             "today_date": 1,
             "raw_news": 1
         }
-        result = mongo_handler.find_one("fundamentals_of_top_list_symbols", query, projection=projection)
+        result = await mongo_handler.find_one("fundamentals_of_top_list_symbols", query, projection=projection, sort=LATEST_FIRST)
         if not result:
             raise HTTPException(status_code=404, detail=f"找不到股票代碼 {symbol} 在日期 {date} 的數據")
         
         news_data = result.get("raw_news", [])
-        return JSONResponse(content={
+        return MongoJSONResponse(content={
             "symbol": symbol.upper(),
             "date": date,
             "news_count": len(news_data),
-            "news": serialize_mongo_data(news_data)
+            "news": news_data
         })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查詢新聞錯誤: {str(e)}")
@@ -493,7 +680,7 @@ async def add_stock_news(
     if item.password != "Abc123456.":
         raise HTTPException(status_code=401, detail="密碼錯誤")
 
-    if not mongo_handler.is_connected():
+    if not await mongo_handler.is_connected():
         raise HTTPException(status_code=503, detail="數據庫連接失敗")
 
     if not item.news or not item.target_document_id:
@@ -510,7 +697,7 @@ async def add_stock_news(
     query = {"symbol": symbol.upper(), "_id": target_oid}
     
     try:
-        existing_doc = mongo_handler.db[collection_name].find_one(query)
+        existing_doc = await mongo_handler.db[collection_name].find_one(query)
 
         if not existing_doc:
             raise HTTPException(status_code=404, detail=f"找不到對應的股票基本面數據 (Symbol: {symbol.upper()}, Document ID: {item.target_document_id})，無法添加新聞。")
@@ -520,7 +707,7 @@ async def add_stock_news(
 
         # GPT Summary
         gpt_summarizer = Summarizer()
-        summary = gpt_summarizer.summarize(item.news)
+        summary = await run_in_threadpool(gpt_summarizer.summarize, item.news)
 
         news_entry = {
             "uuid": str(uuid.uuid4()),
@@ -539,9 +726,9 @@ async def add_stock_news(
 
     請為這則新聞提供建議 (Please provide suggestions for this input):
     """
-        new_suggestion = gpt_summarizer.suggestion(prompt_for_suggestion)
+        new_suggestion = await run_in_threadpool(gpt_summarizer.suggestion, prompt_for_suggestion)
 
-        update_result = mongo_handler.db[collection_name].update_one(
+        update_result = await mongo_handler.db[collection_name].update_one(
             query,
             {"$set": {
                 "raw_news": raw_news_list,
@@ -551,7 +738,9 @@ async def add_stock_news(
         )
 
         if update_result.modified_count > 0: # Removed 'or update_result.upserted_id'
-            return JSONResponse(content={"status": "success", "message": "新聞已成功添加"})
+            response_cache.invalidate(symbol.upper())
+            await mongo_handler.signal_symbol_change(symbol)
+            return MongoJSONResponse(content={"status": "success", "message": "新聞已成功添加"})
         else:
             # This will be hit if the document was found but not modified (e.g., update data was identical or another issue)
             raise HTTPException(status_code=500, detail="添加新聞失敗，文檔未被修改。可能數據已存在或更新未生效。")
@@ -575,7 +764,7 @@ async def delete_stock_news(
     if item.password != "Abc123456.":
         raise HTTPException(status_code=401, detail="密碼錯誤")
 
-    if not mongo_handler.is_connected():
+    if not await mongo_handler.is_connected():
         raise HTTPException(status_code=503, detail="數據庫連接失敗")
 
     try:
@@ -589,7 +778,7 @@ async def delete_stock_news(
     query = {"symbol": symbol.upper(), "_id": target_oid}
 
     try:
-        doc = mongo_handler.find_one(collection_name, query)
+        doc = await mongo_handler.find_one(collection_name, query)
         if not doc or 'raw_news' not in doc:
             raise HTTPException(status_code=404, detail=f"找不到股票 {symbol} 對應ID {item.target_document_id} 的新聞數據")
 
@@ -601,22 +790,24 @@ async def delete_stock_news(
             # This means the news_uuid was not found in the raw_news array of the specified document
             raise HTTPException(status_code=404, detail=f"在文檔ID {item.target_document_id} 中找不到 UUID 為 {news_uuid} 的新聞條目")
 
-        update_result = mongo_handler.update_one(
+        update_result = await mongo_handler.update_one(
             collection_name,
             query,
             {"raw_news": updated_news}
         )
 
         if update_result and update_result.get('modified_count', 0) > 0:
-            return JSONResponse(content={"status": "success", "message": "新聞已成功刪除"})
+            response_cache.invalidate(symbol.upper())
+            await mongo_handler.signal_symbol_change(symbol)
+            return MongoJSONResponse(content={"status": "success", "message": "新聞已成功刪除"})
         else:
             # This case might happen if the document was found but the news item was already deleted by another process
             # or if the update operation itself failed for some reason.
-            existing_doc_after_attempt = mongo_handler.find_one(collection_name, query)
+            existing_doc_after_attempt = await mongo_handler.find_one(collection_name, query)
             if existing_doc_after_attempt and any(n.get("uuid") == news_uuid for n in existing_doc_after_attempt.get('raw_news', [])):
                 raise HTTPException(status_code=500, detail="刪除新聞失敗，請重試")
             else: # Already deleted or never existed post initial check, but update_one reported no modification
-                 return JSONResponse(content={"status": "success", "message": "新聞先前已被刪除或未找到"})
+                 return MongoJSONResponse(content={"status": "success", "message": "新聞先前已被刪除或未找到"})
 
     except HTTPException as e:
         raise e # Re-raise HTTPException to preserve status code and detail
@@ -626,59 +817,44 @@ async def delete_stock_news(
 @app.get("/api/stocks/latest_day")
 async def get_latest_day_stocks(
     limit: int = Query(50, ge=1, le=500, description="返回結果數量限制"),
-    skip: int = Query(0, ge=0, description="跳過的結果數量")
+    skip: int = Query(0, ge=0, description="跳過的結果數量 (建議改用 cursor)"),
+    cursor: Optional[str] = Query(None, description="上一頁返回的 next_cursor")
 ):
     """獲取最新交易日的所有股票數據"""
-    if not mongo_handler.is_connected():
+    if not await mongo_handler.is_connected():
         raise HTTPException(status_code=503, detail="數據庫連接失敗")
+    page_cursor = parse_cursor(cursor)
 
     try:
-        # 1. Find the latest date
-        latest_entry = mongo_handler.db["fundamentals_of_top_list_symbols"].find_one(
-            sort=[("today_date", -1)], 
-            projection={"today_date": 1}
-        )
-        if not latest_entry or "today_date" not in latest_entry:
+        # 翻頁時沿用第一頁的日期，中途出現新的交易日也不會錯頁；否則用緩存的最新交易日指針
+        latest_date = page_cursor[0] if page_cursor else await latest_trading_date()
+        if not latest_date:
             raise HTTPException(status_code=404, detail="數據庫中找不到任何股票數據")
-        
-        latest_date = latest_entry["today_date"]
 
-        # 2. Fetch all stocks for that latest date with pagination
+        # cursor 條件在 $match 中，走索引，深頁和第一頁成本相同；總數用緩存的 count_for_date
         query = {"today_date": latest_date}
-        pipeline = [
-            {"$match": query},
-            {"$skip": skip},
-            {"$limit": limit},
-            {"$project": {
-                "symbol": 1,
-                "name": 1,
-                "day_close": 1,
-                "yesterday_close": 1,
-                "close_change_percentage": 1,
-                "high_change_percentage": 1,
-                "day_high": 1,
-                "day_low": 1,
-                "today_date": 1,
-                "float_risk": 1,
-                "short_signal": 1,
-                "sector": 1
-            }}
-        ]
+        pipeline = keyset_pipeline(query, page_cursor, limit, STOCK_LIST_PROJECTION, skip)
         
         collection = mongo_handler.db["fundamentals_of_top_list_symbols"]
-        results = list(collection.aggregate(pipeline))
-        
-        # Get total count for this date for pagination metadata
-        total_count_for_date = collection.count_documents(query)
+        results = await (await collection.aggregate(pipeline)).to_list()
+        total_count_for_date = await count_for_date(latest_date)
+        if not results and not page_cursor and total_count_for_date == 0:
+            # 指針指向的日期已經沒有數據，下次請求重新查詢最新日期
+            await latest_trading_date(refresh=True)
+            raise HTTPException(status_code=404, detail="數據庫中找不到任何股票數據")
+        results, next_cursor = keyset_page(results, limit)
 
-        return JSONResponse(content={
+        return MongoJSONResponse(content={
             "latest_date_retrieved": latest_date,
             "total_for_date": total_count_for_date,
             "count_in_response": len(results),
             "skip": skip,
             "limit": limit,
-            "data": serialize_mongo_data(results)
+            "next_cursor": next_cursor,
+            "data": results
         })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查詢最新股票數據錯誤: {str(e)}")
 
@@ -686,10 +862,11 @@ async def get_latest_day_stocks(
 async def get_stocks_by_date(
     date: str = Query(..., description="日期格式: YYYY-MM-DD (必填)"),
     limit: int = Query(50, ge=1, le=500, description="返回結果數量限制"),
-    skip: int = Query(0, ge=0, description="跳過的結果數量")
+    skip: int = Query(0, ge=0, description="跳過的結果數量 (建議改用 cursor)"),
+    cursor: Optional[str] = Query(None, description="上一頁返回的 next_cursor")
 ):
     """根據指定日期查詢股票列表"""
-    if not mongo_handler.is_connected():
+    if not await mongo_handler.is_connected():
         raise HTTPException(status_code=503, detail="數據庫連接失敗")
     
     # Basic validation for date format (more robust validation might be needed)
@@ -698,38 +875,25 @@ async def get_stocks_by_date(
     except ValueError:
         raise HTTPException(status_code=400, detail="日期格式無效，請使用 YYYY-MM-DD")
 
+    page_cursor = parse_cursor(cursor)
+    if page_cursor and page_cursor[0] != date:
+        raise HTTPException(status_code=400, detail="cursor 與查詢日期不一致")
+
     query = {"today_date": date}
     
     try:
-        pipeline = [
-            {"$match": query},
-            {"$skip": skip},
-            {"$limit": limit},
-            {"$project": { # Using the same projection as /stocks/ and /latest_day for consistency
-                "symbol": 1,
-                "name": 1,
-                "day_close": 1,
-                "yesterday_close": 1,
-                "close_change_percentage": 1,
-                "high_change_percentage": 1,
-                "day_high": 1,
-                "day_low": 1,
-                "today_date": 1,
-                "float_risk": 1,
-                "short_signal": 1,
-                "sector": 1
-            }}
-        ]
+        pipeline = keyset_pipeline(query, page_cursor, limit, STOCK_LIST_PROJECTION, skip)
         
         collection = mongo_handler.db["fundamentals_of_top_list_symbols"]
-        results = list(collection.aggregate(pipeline))
+        results = await (await collection.aggregate(pipeline)).to_list()
+        results, next_cursor = keyset_page(results, limit)
         
         # Get total count for this date for pagination metadata
-        total_count_for_date = collection.count_documents(query)
+        total_count_for_date = await count_for_date(date)
 
         if total_count_for_date == 0 and not results:
              # Check if any data exists for this date to give a more specific 404
-            return JSONResponse(
+            return MongoJSONResponse(
                 status_code=404, 
                 content={
                     "message": f"在日期 {date} 找不到任何股票數據",
@@ -738,56 +902,49 @@ async def get_stocks_by_date(
                 }
             )
 
-        return JSONResponse(content={
+        return MongoJSONResponse(content={
             "date_queried": date,
             "total_for_date": total_count_for_date,
             "count_in_response": len(results),
             "skip": skip,
             "limit": limit,
-            "data": serialize_mongo_data(results)
+            "next_cursor": next_cursor,
+            "data": results
         })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"根據日期 {date} 查詢股票數據時發生錯誤: {str(e)}")
 
 @app.get("/api/stocks/available_dates")
+@cached_endpoint(response_cache, "available_dates")
 async def get_available_dates():
     """獲取所有可用的交易日期列表"""
-    if not mongo_handler.is_connected():
+    if not await mongo_handler.is_connected():
         raise HTTPException(status_code=503, detail="數據庫連接失敗")
     
     try:
-        # Use MongoDB aggregation to get unique dates and sort them
-        pipeline = [
-            {"$group": {"_id": "$today_date"}},
-            {"$sort": {"_id": -1}},  # Sort in descending order (newest first)
-            {"$project": {
-                "_id": 0,
-                "date": "$_id"
-            }}
-        ]
-        
-        collection = mongo_handler.db["fundamentals_of_top_list_symbols"]
-        dates = list(collection.aggregate(pipeline))
+        # 從 trading_dates 目錄讀取 (只讀)；其他程序寫入的日期由後台任務 reconcile_trading_dates 補齊
+        dates = await mongo_handler.trading_dates()
         
         if not dates:
-            return JSONResponse(content={
+            return MongoJSONResponse(content={
                 "message": "找不到任何交易日期",
                 "dates": []
             })
 
-        # Extract just the date strings from the aggregation result
         date_list = [item["date"] for item in dates]
         
-        return JSONResponse(content={
+        return MongoJSONResponse(content={
             "total_dates": len(date_list),
-            "dates": date_list
+            "dates": date_list,
+            # 每個日期的股票數量、漲幅最大的股票和更新時間
+            "details": dates
         })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"獲取可用日期列表時發生錯誤: {str(e)}")
 
 if __name__ == "__main__":
     # 檢查數據庫連接
-    if not mongo_handler.is_connected():
+    if not get_mongo_handler().is_connected():
         print("警告: 無法連接到 MongoDB 數據庫")
         print("請確保:")
         print("1. MongoDB 服務正在運行")
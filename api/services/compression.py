@@ -0,0 +1,69 @@
+from utils.compression import COMPRESS_MIN_SIZE, choose_encoding, compress_body, is_compressible
+
+# FastAPI 的響應壓縮 (br / gzip)，設定見 utils/compression.py。
+
+
+class CompressionMiddleware:
+    """ASGI 中間件: 壓縮大於 minimum_size 的 JSON / 文本響應
+
+    只處理一次性發送的響應；分多次發送的 (流式) 響應原樣透傳。
+    """
+
+    def __init__(self, app, minimum_size=None, gzip_level=None, brotli_quality=None):
+        self.app = app
+        self.minimum_size = COMPRESS_MIN_SIZE if minimum_size is None else minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding)
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or not is_compressible(content_type):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+
+            if message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                headers = [(name, value) for name, value in start_message.get("headers", [])
+                           if name != b"vary"]
+                vary = [value for name, value in start_message.get("headers", []) if name == b"vary"]
+                headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+
+                if message.get("more_body", False) or encoding is None or len(body) < self.minimum_size:
+                    passthrough = True
+                    await send({**start_message, "headers": headers})
+                    await send(message)
+                    return
+
+                body = compress_body(body, encoding, self.gzip_level, self.brotli_quality)
+                headers = [(name, value) for name, value in headers if name != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                await send({**start_message, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,124 @@
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+
+# 條件 GET: 為 JSON 響應加上 ETag (內容哈希)，請求帶 If-None-Match 且相同時返回 304，
+# 輪詢的客戶端不用重複下載和解析相同的數據。
+# 使用弱 ETag (W/"...")，響應被 gzip 等壓縮後仍然有效。
+# 響應帶 Last-Modified 時 (見 response_cache.cached_endpoint) 也處理 If-Modified-Since；
+# 兩者都有時按 RFC 9110 只看 If-None-Match。
+
+
+def make_etag(body: bytes) -> str:
+    return 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def http_date(timestamp: float) -> str:
+    """Unix 時間戳轉成 HTTP 日期 (Last-Modified 的格式，精確到秒)"""
+    return formatdate(timestamp, usegmt=True)
+
+
+def not_modified_since(if_modified_since: str, last_modified: str) -> bool:
+    """Last-Modified 不晚於 If-Modified-Since 時返回 True，任一個無法解析時返回 False"""
+    if not if_modified_since or not last_modified:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 的弱比較 (忽略 W/ 前綴，支持多個值和 *)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+class ETagMiddleware:
+    """ASGI 中間件: GET 的 200 JSON 響應加上 ETag，命中 If-None-Match (或 If-Modified-Since) 時返回 304
+
+    響應已經帶 ETag (例如從響應緩存返回) 時不再計算哈希。其他類型的響應 (例如流式響應) 原樣透傳。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = ""
+        if_modified_since = ""
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+            elif name == b"if-modified-since":
+                if_modified_since = value.decode("latin-1")
+
+        start_message = None
+        chunks = []
+        passthrough = False
+
+        async def send_with_etag(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                if message["status"] != 200 or not content_type.startswith(b"application/json"):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+
+            if message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                await self._finish(start_message, b"".join(chunks), if_none_match, if_modified_since, send)
+
+        await self.app(scope, receive, send_with_etag)
+
+    async def _finish(self, start_message, body, if_none_match, if_modified_since, send):
+        headers = [(name, value) for name, value in start_message.get("headers", [])]
+        etag = next((value.decode("latin-1") for name, value in headers if name == b"etag"), None)
+        last_modified = next((value.decode("latin-1") for name, value in headers if name == b"last-modified"), None)
+        if etag is None:
+            etag = make_etag(body)
+            headers.append((b"etag", etag.encode("latin-1")))
+        if not any(name == b"cache-control" for name, _ in headers):
+            # 允許客戶端保存，但每次使用前都要用 If-None-Match 重新驗證
+            headers.append((b"cache-control", b"no-cache"))
+
+        if if_none_match:
+            not_modified = etag_matches(if_none_match, etag)
+        else:
+            not_modified = not_modified_since(if_modified_since, last_modified)
+        if not_modified:
+            headers = [(name, value) for name, value in headers
+                       if name not in (b"content-length", b"content-type", b"vary")]
+            # 304 沒有 content-type，CompressionMiddleware 不會處理它；
+            # 帶上 200 響應的 Vary，共享緩存才不會把 br 的內容給只接受 gzip 的客戶端
+            vary = [value for name, value in start_message.get("headers", []) if name == b"vary"]
+            if b"accept-encoding" not in b", ".join(vary).lower():
+                vary.append(b"Accept-Encoding")
+            headers.append((b"vary", b", ".join(vary)))
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send({**start_message, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -1,8 +1,8 @@
 # _utils.py
 
 from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
-import pandas as pd
+from utils.bars import Bars
+from utils.timeframes import timeframe_bars
 
 def format_market_cap(value: Optional[float]) -> str:
     """
@@ -23,64 +23,61 @@ def format_market_cap(value: Optional[float]) -> str:
 def prepare_tvlwc_data(chart_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Prepares chart data for the dash_tvlwc component.
-    Converts 'datetime' to Unix timestamp (seconds) and ensures OHLC values are floats.
+    Converts 'datetime' to an ISO time string and ensures OHLC values are floats.
+    Bars whose datetime cannot be parsed are dropped.
     """
-    if not chart_data:
-        return []
-    
-    formatted_data = []
-    for item in chart_data:
-        if isinstance(item.get('datetime'), str):
-            try:
-                dt = datetime.fromisoformat(item['datetime'])
-            except ValueError:
-                continue
-        else:
-            dt = item.get('datetime')
-            
-        if not dt:
-            continue
-            
-        formatted_data.append({
-            'time': dt.isoformat(),
-            'open': float(item.get('open', 0)),
-            'high': float(item.get('high', 0)),
-            'low': float(item.get('low', 0)),
-            'close': float(item.get('close', 0)),
-            'volume': float(item.get('volume', 0))
-        })
-    
-    return formatted_data
+    return Bars.from_records(chart_data).to_records(time_key='time', iso=True)
 
-def filter_chart_data(chart_data: List[Dict[str, Any]], interval: str = '1min') -> List[Dict[str, Any]]:
-    """根據時間間隔過濾圖表數據"""
-    if not chart_data:
-        return []
-    
-    df = pd.DataFrame(chart_data)
-    if 'datetime' not in df.columns:
-        return []
-    
-    # 確保datetime列是datetime類型
-    if df['datetime'].dtype == 'object':
-        df['datetime'] = pd.to_datetime(df['datetime'])
-    
-    now = datetime.now()
-    
-    if interval == '1min':
-        # 只保留最近3小時的數據
-        cutoff = now - timedelta(hours=3)
-        df = df[df['datetime'] >= cutoff]
-    elif interval == '5min':
-        # 只保留當天的數據
-        today = now.date()
-        df = df[df['datetime'].dt.date == today]
-    elif interval == '1day':
-        # 保留最近30天的數據
-        cutoff = now - timedelta(days=30)
-        df = df[df['datetime'] >= cutoff]
-    
-    # 按時間排序
-    df = df.sort_values('datetime')
-    
-    return df.to_dict('records')
\ No newline at end of file
+def filter_chart_data(chart_data: List[Dict[str, Any]], interval: str = '1m') -> List[Dict[str, Any]]:
+    """根據時間框架 (1m / 5m / 1d，也接受 1min / 5min / 1day) 截取窗口，見 utils/timeframes.py"""
+    return timeframe_bars(chart_data, interval).to_records()
+
+def prepare_chart_payload(chart_data: List[Dict[str, Any]], interval: str = '1m', format: str = 'rows'):
+    """
+    解析一次 -> 排序 -> 二分查找截取窗口 -> 輸出 Tvlwc 格式 (rows) 或列式格式 (columnar)。
+    """
+    bars = timeframe_bars(chart_data, interval)
+    if format == 'columnar':
+        return bars.to_columnar()
+    return bars.to_records(time_key='time', iso=True)
+
+# 各響應用到的文檔字段 (POST /stocks/batch 用來決定 projection)
+CHART_FIELDS = ('1d_chart_data', '1m_chart_data', '5m_chart_data')
+
+PRICE_OVERVIEW_FIELDS = ('symbol', 'yesterday_close', 'day_low', 'day_high', 'day_close',
+                         'market_open_high', 'market_open_low', 'key_levels')
+
+ANALYSIS_FIELDS = ('symbol', 'suggestion', 'sec_filing_analysis', 'key_levels', 'float_risk', 'short_signal',
+                   'hype_score', 'squeeze_score', 'atm_urgency', 'cash', 'debt')
+
+def build_fundamentals(result: Dict[str, Any]) -> Dict[str, Any]:
+    """/stocks/{symbol}/fundamentals 的響應: 去掉圖表數據，加上格式化的市值"""
+    fundamentals = {key: value for key, value in result.items() if key not in CHART_FIELDS}
+    market_cap_float = fundamentals.get('market_cap_float')
+    if market_cap_float:
+        fundamentals['market_cap_formatted'] = format_market_cap(market_cap_float)
+    return fundamentals
+
+def build_price_overview(result: Dict[str, Any]) -> Dict[str, Any]:
+    """/stocks/{symbol}/price-overview 的響應"""
+    overview = {key: result.get(key) for key in PRICE_OVERVIEW_FIELDS}
+    overview['key_levels'] = result.get('key_levels', [])
+    return overview
+
+def build_analysis(result: Dict[str, Any]) -> Dict[str, Any]:
+    """/stocks/{symbol}/analysis 的響應 (現金和債務換算為百萬)"""
+    cash = result.get("cash")
+    debt = result.get("debt")
+    return {
+        "symbol": result.get("symbol"),
+        "suggestion": result.get("suggestion"),
+        "sec_filing_analysis": result.get("sec_filing_analysis"),
+        "key_levels": result.get("key_levels"),
+        "float_risk": result.get("float_risk"),
+        "short_signal": result.get("short_signal"),
+        "hype_score": result.get("hype_score"),
+        "squeeze_score": result.get("squeeze_score"),
+        "atm_urgency": result.get("atm_urgency"),
+        "cash_in_millions": float(cash / 1_000_000) if cash is not None else None,
+        "debt_in_millions": float(debt / 1_000_000) if debt is not None else None
+    }
@@ -0,0 +1,79 @@
+# mongo_json.py
+
+import json
+import math
+from datetime import datetime, timezone
+from typing import Any
+
+from bson import ObjectId, Decimal128, json_util
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson 是可選依賴，沒有安裝時使用標準庫 json
+    orjson = None
+
+
+# 一次編碼 MongoDB 文檔為 JSON bytes，輸出格式與 json_util.dumps (relaxed Extended JSON) 相同:
+#   ObjectId   -> {"$oid": "..."}
+#   datetime   -> {"$date": "2025-05-22T13:27:00Z"} (1970 年之前為 {"$date": {"$numberLong": "..."}})
+#   Decimal128 -> {"$numberDecimal": "..."}
+# 其他 BSON 類型交給 json_util.default 處理。NaN / Infinity 輸出為 null。
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _encode_datetime(value: datetime) -> dict:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    if value.year < 1970:
+        millis = int((value.replace(tzinfo=timezone.utc) - _EPOCH).total_seconds() * 1000)
+        return {"$date": {"$numberLong": str(millis)}}
+    text = value.strftime("%Y-%m-%dT%H:%M:%S")
+    if value.microsecond:
+        text += f".{value.microsecond // 1000:03d}"
+    return {"$date": text + "Z"}
+
+
+def mongo_default(value: Any) -> Any:
+    """json.dumps / orjson.dumps 的 default 函數"""
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    if isinstance(value, datetime):
+        return _encode_datetime(value)
+    if isinstance(value, Decimal128):
+        return {"$numberDecimal": str(value)}
+    return json_util.default(value)
+
+
+def _replace_non_finite(data: Any) -> Any:
+    """把 NaN / Infinity 換成 None (只在標準庫編碼失敗時使用)"""
+    if isinstance(data, float):
+        return data if math.isfinite(data) else None
+    if isinstance(data, dict):
+        return {k: _replace_non_finite(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_replace_non_finite(v) for v in data]
+    return data
+
+
+def dumps_mongo(data: Any) -> bytes:
+    """把含有 BSON 類型的數據一次編碼為 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(
+            data,
+            default=mongo_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+    try:
+        text = json.dumps(data, default=mongo_default, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+    except ValueError:
+        text = json.dumps(_replace_non_finite(data), default=mongo_default, ensure_ascii=False, separators=(",", ":"))
+    return text.encode("utf-8")
+
+
+class MongoJSONResponse(JSONResponse):
+    """直接編碼 MongoDB 文檔的 JSONResponse (不需要先 json_util.dumps 再 json.loads)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_mongo(content)
@@ -0,0 +1,74 @@
+import base64
+import json
+
+from bson import ObjectId
+
+# Keyset (cursor) 分頁: 按 (today_date, close_change_percentage, _id) 由大到小排序，
+# 下一頁從上一頁最後一個文檔之後開始，不用 $skip，深頁和第一頁的成本相同 (走索引)。
+# cursor 是這三個值的 urlsafe base64 JSON，對客戶端是不透明的字符串。
+
+SORT_FIELD = "close_change_percentage"
+KEYSET_SORT = {"today_date": -1, SORT_FIELD: -1, "_id": -1}
+
+
+def encode_cursor(doc):
+    key = [doc.get("today_date"), doc.get(SORT_FIELD), str(doc["_id"])]
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """返回 (today_date, close_change_percentage, _id)，格式不對時拋出 ValueError"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        date, value, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(date, str) or not (value is None or isinstance(value, (int, float))):
+            raise ValueError
+        return date, value, ObjectId(doc_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {token}")
+
+
+def after_cursor(cursor, descending=True):
+    """排在 cursor 之後的文檔的查詢條件
+
+    descending 是 close_change_percentage 和 _id 的方向 (today_date 總是由新到舊)。
+    降序排序時 null / 缺失的 close_change_percentage 排在所有數字之後，升序時排在最前，
+    而 $lt / $gt 不會匹配 null，所以要單獨處理 null。
+    """
+    date, value, doc_id = cursor
+    same_date = {"today_date": date}
+    beyond = "$lt" if descending else "$gt"
+    if value is None:
+        branches = [{**same_date, SORT_FIELD: None, "_id": {beyond: doc_id}}]
+        if not descending:
+            branches.append({**same_date, SORT_FIELD: {"$ne": None}})
+    else:
+        branches = [
+            {**same_date, SORT_FIELD: value, "_id": {beyond: doc_id}},
+            {**same_date, SORT_FIELD: {beyond: value}},
+        ]
+        if descending:
+            branches.append({**same_date, SORT_FIELD: None})
+    return {"$or": [{"today_date": {"$lt": date}}] + branches}
+
+
+def keyset_pipeline(query, cursor=None, limit=50, projection=None, skip=0):
+    """分頁聚合管道，多取一條用來判斷是否還有下一頁 (見 keyset_page)"""
+    match = dict(query)
+    if cursor is not None:
+        match = {"$and": [query, after_cursor(cursor)]} if query else after_cursor(cursor)
+    pipeline = [{"$match": match}, {"$sort": KEYSET_SORT}]
+    if skip:
+        pipeline.append({"$skip": skip})
+    pipeline.append({"$limit": limit + 1})
+    if projection:
+        pipeline.append({"$project": projection})
+    return pipeline
+
+
+def keyset_page(results, limit):
+    """返回 (本頁數據, 下一頁 cursor 或 None)"""
+    if len(results) > limit:
+        results = results[:limit]
+        return results, encode_cursor(results[-1])
+    return results, None
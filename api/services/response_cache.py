@@ -0,0 +1,152 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from fastapi.responses import Response
+
+from api.services.etag import http_date, make_etag
+from api.services.mongo_json import MongoJSONResponse
+
+# 只讀端點的進程內響應緩存 (TTL + LRU)，緩存的是已編碼的 JSON bytes 和它的 ETag。
+# 過去日期的數據不會再變，TTL 較長；今天 (或未指定日期 = 最新) 的數據會被 bot 更新，TTL 較短。
+# 新增 / 刪除新聞後按股票代碼 (tag) 主動失效；其他進程 (Dash 回調、其他 API worker) 的修改
+# 通過 cache_invalidations 集合傳遞，由 watch_invalidations 輪詢。
+
+API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "1024"))
+API_CACHE_TTL_TODAY = float(os.getenv("API_CACHE_TTL_TODAY", "30"))
+API_CACHE_TTL_PAST = float(os.getenv("API_CACHE_TTL_PAST", str(6 * 3600)))
+API_CACHE_INVALIDATION_POLL = float(os.getenv("API_CACHE_INVALIDATION_POLL", "5"))
+
+
+def today_str():
+    return datetime.now(ZoneInfo("America/New_York")).strftime('%Y-%m-%d')
+
+
+class ResponseCache:
+    """LRU 緩存，每個條目有自己的過期時間和 tag"""
+
+    def __init__(self, max_entries=None, ttl_today=None, ttl_past=None):
+        self.max_entries = max_entries or API_CACHE_MAX_ENTRIES
+        self.ttl_today = ttl_today if ttl_today is not None else API_CACHE_TTL_TODAY
+        self.ttl_past = ttl_past if ttl_past is not None else API_CACHE_TTL_PAST
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl_for_date(self, date):
+        """過去的日期用長 TTL，今天或未指定日期用短 TTL"""
+        if date and date < today_str():
+            return self.ttl_past
+        return self.ttl_today
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl, tags=()):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value, frozenset(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tag):
+        """刪除帶有 tag 的所有條目，返回刪除的數量"""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if tag in entry[2]]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "ttl_today": self.ttl_today,
+                "ttl_past": self.ttl_past,
+            }
+
+
+def cached_endpoint(cache, name, date_param="date", tag_param="symbol"):
+    """FastAPI 端點裝飾器: 按 端點名 + 參數 緩存 200 響應
+
+    date_param 決定 TTL，tag_param (股票代碼，轉大寫，緩存鍵中也轉大寫) 和端點名用於 invalidate()。
+    端點拋出的 HTTPException 不會被緩存。
+
+    Last-Modified 是緩存條目生成的時間: 文檔沒有更新時間字段，today_date 只精確到天 (當天 bot 仍在寫入)；
+    數據可能改變時 (TTL 過期、invalidate) 條目會重新生成，Last-Modified 隨之更新。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            key = (name, tuple(sorted(
+                (param, str(value).upper() if param == tag_param else str(value)) for param, value in kwargs.items()
+            )))
+            cached = cache.get(key)
+            if cached is not None:
+                body, etag, last_modified = cached
+                return Response(content=body, media_type="application/json",
+                                headers={"X-Cache": "HIT", "ETag": etag, "Last-Modified": last_modified})
+
+            response = await func(**kwargs)
+            if not isinstance(response, Response):
+                response = MongoJSONResponse(content=response)
+            if response.status_code == 200:
+                # ETag 只在寫入緩存時計算一次，之後命中時直接使用 (見 api/services/etag.py)
+                etag = make_etag(response.body)
+                last_modified = http_date(time.time())
+                response.headers["ETag"] = etag
+                response.headers["Last-Modified"] = last_modified
+                tag = kwargs.get(tag_param)
+                tags = [name, str(tag).upper()] if tag else [name]
+                cache.set(key, (response.body, etag, last_modified), cache.ttl_for_date(kwargs.get(date_param)), tags)
+            response.headers["X-Cache"] = "MISS"
+            return response
+        return wrapper
+    return decorator
+
+
+async def watch_invalidations(caches, mongo_handler, interval=None):
+    """輪詢 cache_invalidations，讓其他進程修改過的股票代碼在 caches 中失效 (在 API 啟動時作為後台任務運行)"""
+    interval = interval or API_CACHE_INVALIDATION_POLL
+    since = None
+    while True:
+        try:
+            changes, since = await mongo_handler.symbol_changes_since(since)
+            for symbol, _ in changes:
+                for cache in caches:
+                    cache.invalidate(symbol)
+        except Exception as e:
+            print(f"Cache invalidation poll error: {e}")
+        await asyncio.sleep(interval)
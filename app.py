@@ -2,10 +2,18 @@
 import dash
 from dash import dcc, html
 from utils.style import index_string
+from utils.compression import register_flask_compression
+from utils.live_updates import register_live_updates
 
 app = dash.Dash(__name__, suppress_callback_exceptions=True)
 app.index_string = index_string
 
+# 壓縮 callback 響應和頁面資源 (br / gzip)
+register_flask_compression(app.server)
+
+# 列表页的实时推送 (SSE)，见 utils/live_updates.py
+register_live_updates(app.server)
+
 # Import callbacks after app creation
 from callbacks.main import register_main_callbacks
 from callbacks.stock import register_stock_callbacks
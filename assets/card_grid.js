@@ -0,0 +1,60 @@
+// 卡片列表的無限滾動: "Load more" 按鈕進入視窗時自動點擊，由 callbacks/main.py 的 load_more_cards 追加下一頁。
+// 上一次點擊的結果回來之前 (列表或按鈕還沒有變化) 不再點擊，否則同一頁會被追加兩次。
+(function () {
+    var PENDING_TIMEOUT_MS = 10000;
+    var observer = null;
+    var observed = null;
+    var pending = null;
+
+    function clearPending() {
+        if (pending === null) {
+            return;
+        }
+        pending.mutations.disconnect();
+        clearTimeout(pending.timer);
+        pending = null;
+        if (observed !== null) {
+            // 重新觀察: 按鈕仍在視窗附近時立即觸發下一次載入
+            observer.unobserve(observed);
+            observer.observe(observed);
+        }
+    }
+
+    function onIntersect(entries) {
+        entries.forEach(function (entry) {
+            var button = entry.target;
+            if (entry.isIntersecting && button.style.display !== 'none' && pending === null) {
+                // 列表追加了卡片、按鈕被隱藏或替換時才允許下一次點擊 (沒有新數據時由超時解除)
+                var mutations = new MutationObserver(clearPending);
+                if (button.previousElementSibling) {
+                    mutations.observe(button.previousElementSibling, {childList: true});
+                }
+                mutations.observe(button, {attributes: true, attributeFilter: ['style']});
+                pending = {mutations: mutations, timer: setTimeout(clearPending, PENDING_TIMEOUT_MS)};
+                button.click();
+            }
+        });
+    }
+
+    function sync() {
+        var button = document.getElementById('grid-load-more');
+        if (button === observed || !window.IntersectionObserver) {
+            return;
+        }
+        if (observer === null) {
+            // 提前 600px 載入，滾動到底部時下一頁已經在路上
+            observer = new IntersectionObserver(onIntersect, {rootMargin: '600px'});
+        }
+        if (observed !== null) {
+            observer.unobserve(observed);
+        }
+        observed = null;
+        clearPending();
+        observed = button;
+        if (button !== null) {
+            observer.observe(button);
+        }
+    }
+
+    setInterval(sync, 1000);
+})();
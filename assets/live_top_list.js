@@ -0,0 +1,46 @@
+// 列表頁的實時更新: 頁面上有 #live-top-list 時訂閱 /live/top-list (SSE)，
+// 事件攢成一批寫入 live-top-list-event，由 callbacks/main.py 的 apply_live_updates 只修改對應的卡片。
+(function () {
+    var BATCH_MS = 250;
+    var source = null;
+    var pending = [];
+    var timer = null;
+    var batchId = 0;
+
+    function flush() {
+        timer = null;
+        if (!pending.length || !window.dash_clientside || !window.dash_clientside.set_props) {
+            return;
+        }
+        batchId += 1;
+        window.dash_clientside.set_props('live-top-list-event', {data: {id: batchId, events: pending}});
+        pending = [];
+    }
+
+    function onMessage(message) {
+        var event = JSON.parse(message.data);
+        if (event.op === 'reset') {
+            // 服務器端積壓的事件被丟棄了，重新載入整個列表
+            window.location.reload();
+            return;
+        }
+        pending.push(event);
+        if (timer === null) {
+            timer = setTimeout(flush, BATCH_MS);
+        }
+    }
+
+    function sync() {
+        var onListPage = document.getElementById('live-top-list') !== null;
+        if (onListPage && source === null && window.EventSource) {
+            source = new EventSource('/live/top-list');
+            source.onmessage = onMessage;
+        } else if (!onListPage && source !== null) {
+            source.close();
+            source = null;
+            pending = [];
+        }
+    }
+
+    setInterval(sync, 1000);
+})();
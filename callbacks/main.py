@@ -1,78 +1,249 @@
-from _mongo import MongoHandler
+import bisect
+import os
+import threading
+
+from _mongo import get_mongo_handler
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from dash import Input, Output
+from dash import Input, Output, State, ALL, Patch, no_update
+from dash.exceptions import PreventUpdate
 from urllib.parse import unquote
 from datetime import timezone
 from layout.stock_list import create_empty_state
 # 股票列表页逻辑
-from layout.stock_list import create_stock_list_page
+from layout.stock_list import (
+    create_stock_list_page,
+    create_date_tab_content,
+    create_strategy_tab_content,
+    default_grid_view,
+    load_more_style,
+)
 from layout.stock_detail import create_stock_detail_page
 from layout.stock_list import strategy_list_page
 from layout.strategy_detail import create_strategy_detail_page
+from components.cards import STOCK_CARD_FIELDS, create_stock_card
+from api.services.pagination import after_cursor, decode_cursor, encode_cursor
+from utils.timeframes import chart_window_pipeline
+from utils.live_updates import LIST_LOOKBACK_DAYS, get_top_list_watcher
+
+
+COLLECTION_NAME = 'fundamentals_of_top_list_symbols'
+# 卡片列表每页的数量 (滚动到底部时再载入下一页)
+CARD_PAGE_SIZE = int(os.getenv("CARD_PAGE_SIZE", "40"))
+SORT_FIELD = 'close_change_percentage'
+
+
+def _rank(card, descending):
+    """卡片在当前排序方向下的排序值 (越小越靠前)，没有涨跌幅时返回 None"""
+    value = card.get(SORT_FIELD) if card else None
+    if value is None:
+        return None
+    return -value if descending else value
+
+
+def beyond_cursor(card, cursor, descending):
+    """卡片是否排在 cursor (decode_cursor 的结果) 之后，和 after_cursor 的数据库条件相同 (同一日期)"""
+    _, value, doc_id = cursor
+    card_value, card_id = card.get(SORT_FIELD), str(card.get('_id'))
+    if descending:
+        return card_value < value or (card_value == value and card_id < str(doc_id))
+    return card_value > value or (card_value == value and card_id > str(doc_id))
+
+
+def matches_view(card, view):
+    """卡片是否符合列表当前的过滤条件 (Float Risk / Sector)"""
+    return ((not view.get('float_risk') or card.get('float_risk') in view['float_risk'])
+            and (not view.get('sector') or card.get('sector') in view['sector']))
+
+
+def live_update_patches(events, list_ids, card_ids, known_cards, view=None):
+    """把推送的事件转换成每个日期列表的 Patch (只插入 / 删除受影响的卡片)
+
+    list_ids 是页面上的列表 (每个日期一个)，card_ids 是页面上卡片的 id (按页面顺序)，
+    known_cards 是 {(date, symbol): card}，用来取没有变化的卡片的涨跌幅。
+    view 是列表的排序和过滤条件 (见 default_grid_view)，不符合过滤条件的卡片会被移除；
+    排在 view['cursor'] (已载入部分的边界) 之后的卡片留给下一页。页面上没有的日期不处理 (新的日期要重新载入页面)。
+
+    先移除这批事件涉及的所有卡片，再把仍然存在的卡片用 bisect 插回剩下的有序列表，
+    同一批中多个事件的先后顺序不影响结果。
+    """
+    view = view or {}
+    descending = view.get('sort', 'desc') == 'desc'
+    cursor = decode_cursor(view['cursor']) if view.get('has_more') and view.get('cursor') else None
+    order = {list_id['index']: [] for list_id in list_ids}
+    for card_id in card_ids:
+        if card_id['date'] in order:
+            order[card_id['date']].append(card_id['index'])
+
+    # 同一张卡片只看这批中的最后一个事件
+    latest = {}
+    for event in events:
+        card = event.get('card') or {}
+        if card.get('today_date') in order:
+            latest[(card['today_date'], card.get('symbol'))] = event
+
+    patches = {}
+    for date, symbols in order.items():
+        touched = {symbol: event for (event_date, symbol), event in latest.items() if event_date == date}
+        if not touched:
+            continue
+        patch = Patch()
+        # 从后往前删，前面的位置不受影响
+        for position in reversed(range(len(symbols))):
+            if symbols[position] in touched:
+                del patch[position]
+        symbols = [symbol for symbol in symbols if symbol not in touched]
+
+        # 剩下卡片的排序值；不知道的卡片沿用前一张的值，保证列表单调，bisect 才成立
+        ranks = []
+        running = float('-inf')
+        for symbol in symbols:
+            rank = _rank(known_cards.get((date, symbol)), descending)
+            running = running if rank is None else max(running, rank)
+            ranks.append(running)
+
+        for symbol, event in touched.items():
+            card = event['card']
+            rank = _rank(card, descending)
+            if event['op'] == 'delete' or rank is None or not matches_view(card, view):
+                continue
+            if cursor is not None and beyond_cursor(card, cursor, descending):
+                # 排到已载入部分之后了，留给下一页 (下一页从 cursor 开始，会包含这张卡片)
+                continue
+            position = bisect.bisect_right(ranks, rank)
+            patch.insert(position, create_stock_card(card))
+            symbols.insert(position, symbol)
+            ranks.insert(position, rank)
+        patches[date] = patch
+
+    return patches
+
+
+def query_date_cards(mongo_handler, view, cursor=None):
+    """按 view 的日期、过滤条件和排序取一页卡片，返回 (cards, next_cursor)
+
+    cursor 是上一页返回的 next_cursor (keyset 分页: 从上一页最后一张卡片之后开始，
+    中途有卡片插入或删除也不会错位)。优先从内存取，还没同步好时查询数据库。
+    next_cursor 为 None 表示没有下一页。
+    """
+    descending = view.get('sort', 'desc') == 'desc'
+    after = decode_cursor(cursor) if cursor else None
+    watcher = get_top_list_watcher()
+    if watcher.is_warm():
+        cards = watcher.cards_for_date(view['date'])
+        if not descending:
+            cards.reverse()
+        cards = [card for card in cards
+                 if matches_view(card, view) and (after is None or beyond_cursor(card, after, descending))]
+        cards = cards[:CARD_PAGE_SIZE + 1]
+    else:
+        cards = mongo_handler.aggregate(COLLECTION_NAME, date_cards_pipeline(view, after))
+    if len(cards) > CARD_PAGE_SIZE:
+        cards = cards[:CARD_PAGE_SIZE]
+        return cards, encode_cursor(cards[-1])
+    return cards, None
+
+
+def date_cards_pipeline(view, cursor=None):
+    """query_date_cards 的数据库查询 (多取一条判断是否还有下一页)
+
+    过滤 None、过滤条件、排序和分页都在数据库完成 (today_date + close_change_percentage + _id 索引)。
+    """
+    descending = view.get('sort', 'desc') == 'desc'
+    match = {'today_date': view['date'], SORT_FIELD: {'$ne': None}}
+    if view.get('float_risk'):
+        match['float_risk'] = {'$in': view['float_risk']}
+    if view.get('sector'):
+        match['sector'] = {'$in': view['sector']}
+    if cursor is not None:
+        match = {'$and': [match, after_cursor(cursor, descending)]}
+    direction = -1 if descending else 1
+    return [
+        {'$match': match},
+        {'$sort': {SORT_FIELD: direction, '_id': direction}},
+        {'$limit': CARD_PAGE_SIZE + 1},
+        {'$project': STOCK_CARD_FIELDS},
+    ]
+
+
+def grid_filter_options(mongo_handler, date):
+    """某个日期可选的 Float Risk / Sector (下拉框选项)"""
+    watcher = get_top_list_watcher()
+    if watcher.is_warm():
+        cards = watcher.cards_for_date(date)
+        values = {field: {card.get(field) for card in cards} for field in ('float_risk', 'sector')}
+    else:
+        results = mongo_handler.aggregate(COLLECTION_NAME, [
+            {'$match': {'today_date': date, SORT_FIELD: {'$ne': None}}},
+            {'$group': {'_id': None, 'float_risk': {'$addToSet': '$float_risk'}, 'sector': {'$addToSet': '$sector'}}},
+        ])
+        values = results[0] if results else {}
+    return {
+        field: [{'label': value, 'value': value} for value in sorted(v for v in values.get(field, []) if v)]
+        for field in ('float_risk', 'sector')
+    }
+
+
+def load_card_grid(mongo_handler, date):
+    """一个日期的卡片列表第一页，返回 (cards, view, options)"""
+    view = default_grid_view(date)
+    cards, view['cursor'] = query_date_cards(mongo_handler, view)
+    view['has_more'] = view['cursor'] is not None
+    return cards, view, grid_filter_options(mongo_handler, date)
+
+
+_started_pid = None
+
+
+def start_background_work():
+    """每个进程收到第一个请求时: 在后台建立索引、启动列表数据的监听线程
+
+    不在 import / 注册 callback 时做: MongoDB 不可用时不阻塞启动，
+    pre-fork 的服务器 (gunicorn) 也由每个 worker 自己启动线程。
+    """
+    global _started_pid
+    if _started_pid == os.getpid():
+        return
+    _started_pid = os.getpid()
+    # 建立 _mongo.INDEX_REGISTRY 中声明的索引
+    threading.Thread(target=get_mongo_handler().ensure_indexes, name="ensure-indexes", daemon=True).start()
+    # 预热进程内的列表数据 (之后由 change stream / 轮询增量更新)
+    get_top_list_watcher().start()
 
 
 def register_main_callbacks(app):
+    app.server.before_request(start_background_work)
+
     @app.callback(
         Output('page-content', 'children'),
         [Input('url', 'pathname')]
     )
     def display_page(pathname):
-        mongo_handler = MongoHandler()
+        mongo_handler = get_mongo_handler()
+        watcher = get_top_list_watcher()
         tz = ZoneInfo("America/New_York")
         today = datetime.now(tz).date()
-        yesterday = today - timedelta(days=1)
-        five_days_ago = today - timedelta(days=5)
-        print(f"Five day ago: {five_days_ago}")
-        #five_days_ago_dt = datetime.combine(five_days_ago, datetime.min.time()).replace(tzinfo=timezone.utc)
-
-        # 获取最近5天的所有数据
-        all_recent_data = mongo_handler.find_doc(
-            'fundamentals_of_top_list_symbols',
-            {'today_date': {'$gte': five_days_ago.strftime('%Y-%m-%d')}},
-             #{'today_date': {'$gte': five_days_ago_dt}}
-        )
-
-        print (f"All recent data: {all_recent_data[0]['close_change_percentage']}")
-
-        # 如果没有数据，返回空状态
-        if not all_recent_data:
-            
-            return create_empty_state(today.strftime('%Y-%m-%d'))
-
-        # 按日期分组数据
-        date_grouped_data = {}
-        for doc in all_recent_data:
-            date = doc.get('today_date')
-            if date not in date_grouped_data:
-                date_grouped_data[date] = []
-            date_grouped_data[date].append(doc)
-
-        # 对每个日期的数据，先过滤掉 None，再按涨跌幅排序
-        for date in date_grouped_data:
-            filtered_items = [x for x in date_grouped_data[date] if x.get('close_change_percentage') is not None]
-            
-            filtered_items.sort(
-                key=lambda x: float(x['close_change_percentage']),
-                reverse=True  # 從大到小排序
-            )
-
-            # 更新排序後的資料回去（如果你希望保留原有資料結構）
-            date_grouped_data[date] = filtered_items
 
         # 路由逻辑
         if pathname.startswith('/stock/'):
-            # 个股详情页逻辑
-            symbol = pathname.split('/')[-1]
-            # 查找该symbol的最新数据
-            selected_stock = None
-            for date in sorted(date_grouped_data.keys(), reverse=True):
-                for stock in date_grouped_data[date]:
-                    if stock.get('symbol') == symbol:
-                        selected_stock = stock
-                        break
-                if selected_stock:
-                    break
+            # 个股详情页逻辑: /stock/<symbol> 取该symbol最新一天，/stock/<symbol>/<date> 取指定日期
+            # K线在数据库端截取显示窗口
+            parts = [unquote(part) for part in pathname.split('/')[2:] if part]
+            symbol = parts[0] if parts else ''
+            date = parts[1] if len(parts) > 1 else None
+            # 内存中的 symbol 索引 (utils/live_updates.py) 直接给出文档 _id，按主键查询
+            doc_id = watcher.find_id(symbol, date) if watcher.is_warm() else None
+            if doc_id is not None:
+                query = {'_id': doc_id}
+            elif date:
+                query = {'symbol': symbol, 'today_date': date}
+            else:
+                query = {'symbol': symbol, 'close_change_percentage': {'$ne': None}}
+                recent_dates = mongo_handler.recent_trading_dates(LIST_LOOKBACK_DAYS)
+                if recent_dates:
+                    query['today_date'] = {'$gte': recent_dates[-1]}
+            results = mongo_handler.aggregate(COLLECTION_NAME, chart_window_pipeline(query))
+            selected_stock = results[0] if results else None
             
             if selected_stock:
                 
@@ -91,14 +262,90 @@ def register_main_callbacks(app):
             #print(unquoted_strategy_name)
             return create_strategy_detail_page(unquoted_strategy_name)
         else:
+            # 列表页只需要卡片字段，不载入图表/新闻/SEC 数据
+            # 显示最近 LIST_LOOKBACK_DAYS 个交易日，但只载入最新一天的卡片，其他日期切换标签时再载入
+            if watcher.is_warm():
+                dates = watcher.dates()
+            else:
+                dates = mongo_handler.recent_trading_dates(LIST_LOOKBACK_DAYS)
+
+            # 如果没有数据，返回空状态
+            if not dates:
+                
+                return create_empty_state(today.strftime('%Y-%m-%d'))
             
-            
-            # 准备传递给create_stock_list_page的数据
-            # 将所有日期的数据合并成一个列表，但保留日期信息
-            all_data = []
-            for date in date_grouped_data:
-                all_data.extend(date_grouped_data[date])
-            
-            return create_stock_list_page(all_data)
+            return create_stock_list_page(dates, *load_card_grid(mongo_handler, dates[0]))
+
+        return 'Page not found'
 
-        return 'Page not found'
\ No newline at end of file
+    # 日期标签按需载入 (第一次渲染时 display_page 已经放入最新日期的卡片)
+    @app.callback(
+        Output('date-tab-content', 'children'),
+        Output('grid-view', 'data', allow_duplicate=True),
+        Input('date-tabs', 'value'),
+        prevent_initial_call=True
+    )
+    def render_date_tab(date):
+        if date == 'strategy':
+            return create_strategy_tab_content(), no_update
+        stocks, view, options = load_card_grid(get_mongo_handler(), date)
+        return create_date_tab_content(date, stocks, view, options), view
+
+    # 卡片列表的排序 / 过滤: 在服务器端重新查询第一页
+    @app.callback(
+        Output({'type': 'stock-list', 'index': ALL}, 'children', allow_duplicate=True),
+        Output('grid-view', 'data'),
+        Output('grid-load-more', 'style'),
+        Input('grid-sort', 'value'),
+        Input('grid-float-risk', 'value'),
+        Input('grid-sector', 'value'),
+        State('grid-view', 'data'),
+        State({'type': 'stock-list', 'index': ALL}, 'id'),
+        prevent_initial_call=True
+    )
+    def update_card_grid(sort, float_risk, sector, view, list_ids):
+        view = {**view, 'sort': sort or 'desc', 'float_risk': float_risk or [], 'sector': sector or []}
+        cards, view['cursor'] = query_date_cards(get_mongo_handler(), view)
+        view['has_more'] = view['cursor'] is not None
+        children = [create_stock_card(card) for card in cards]
+        return [children for _ in list_ids], view, load_more_style(view['has_more'])
+
+    # 卡片列表的下一页 (assets/card_grid.js 在按钮滚动到可见时触发)，只在列表末尾追加
+    @app.callback(
+        Output({'type': 'stock-list', 'index': ALL}, 'children', allow_duplicate=True),
+        Output('grid-view', 'data', allow_duplicate=True),
+        Output('grid-load-more', 'style', allow_duplicate=True),
+        Input('grid-load-more', 'n_clicks'),
+        State('grid-view', 'data'),
+        State({'type': 'stock-list', 'index': ALL}, 'id'),
+        State({'type': 'stock-card', 'index': ALL, 'date': ALL}, 'id'),
+        prevent_initial_call=True
+    )
+    def load_more_cards(n_clicks, view, list_ids, card_ids):
+        if not n_clicks or not view or not view.get('has_more'):
+            raise PreventUpdate
+        cards, next_cursor = query_date_cards(get_mongo_handler(), view, view.get('cursor'))
+        # 实时更新已经插入的卡片不再追加
+        shown = {card_id['index'] for card_id in card_ids if card_id['date'] == view['date']}
+        patch = Patch()
+        patch.extend([create_stock_card(card) for card in cards if card['symbol'] not in shown])
+        view = {**view, 'cursor': next_cursor, 'has_more': next_cursor is not None}
+        return [patch for _ in list_ids], view, load_more_style(view['has_more'])
+
+    # 列表页的实时更新 (utils/live_updates.py 推送，assets/live_top_list.js 写入 live-top-list-event)
+    @app.callback(
+        Output({'type': 'stock-list', 'index': ALL}, 'children'),
+        Input('live-top-list-event', 'data'),
+        State({'type': 'stock-list', 'index': ALL}, 'id'),
+        State({'type': 'stock-card', 'index': ALL, 'date': ALL}, 'id'),
+        State('grid-view', 'data'),
+        prevent_initial_call=True
+    )
+    def apply_live_updates(batch, list_ids, card_ids, view):
+        if not batch or not batch.get('events'):
+            raise PreventUpdate
+        known_cards = {(card['today_date'], card['symbol']): card for card in get_top_list_watcher().cards()}
+        patches = live_update_patches(batch['events'], list_ids, card_ids, known_cards, view)
+        if not patches:
+            raise PreventUpdate
+        return [patches.get(list_id['index'], no_update) for list_id in list_ids]
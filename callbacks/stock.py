@@ -5,7 +5,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from dash import Input, Output, State, callback_context, no_update, html
 import dash
 from dash.exceptions import PreventUpdate
-from _mongo import MongoHandler
+from _mongo import get_mongo_handler
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -33,8 +33,8 @@ def register_stock_callbacks(app):
     #region Navigation Stock
     @app.callback(
         Output('url', 'pathname'),
-        [Input({'type': 'stock-card', 'index': dash.dependencies.ALL}, 'n_clicks')],
-        [State({'type': 'stock-card', 'index': dash.dependencies.ALL}, 'id')]
+        [Input({'type': 'stock-card', 'index': dash.dependencies.ALL, 'date': dash.dependencies.ALL}, 'n_clicks')],
+        [State({'type': 'stock-card', 'index': dash.dependencies.ALL, 'date': dash.dependencies.ALL}, 'id')]
     )
     def navigate_to_stock(n_clicks, ids):
         if not any(n_clicks):
@@ -45,8 +45,8 @@ def register_stock_callbacks(app):
             raise PreventUpdate
         
         clicked_id = ctx.triggered[0]['prop_id'].split('.')[0]
-        symbol = json.loads(clicked_id)['index']
-        return f'/stock/{symbol}'
+        card_id = json.loads(clicked_id)
+        return f"/stock/{card_id['index']}/{card_id['date']}"
 
 
     #region Navigation Back
@@ -89,7 +89,7 @@ def register_stock_callbacks(app):
         if not news_text or not symbol or not date:
             return html.Div("Please enter news text before submitting.", style={'color': 'red'})
 
-        mongo = MongoHandler()
+        mongo = get_mongo_handler()
         if not mongo.is_connected():
             return html.Div("Database connection error.", style={'color': 'red'})
 
@@ -135,6 +135,8 @@ def register_stock_callbacks(app):
         )
 
         if update_result.modified_count > 0 or update_result.upserted_id:
+            # API 進程的響應緩存中有這個股票的新聞和分析，通知它失效
+            mongo.signal_symbol_change(symbol)
             return html.Div("News successfully added!", style={'color': 'green'})
         else:
             return html.Div("Failed to add news.", style={'color': 'red'})
@@ -168,7 +170,7 @@ def register_stock_callbacks(app):
             uuid = button_id['uuid']
             print(f"要刪除的 UUID: {uuid}")
 
-            mongo = MongoHandler()
+            mongo = get_mongo_handler()
             if not mongo.is_connected():
                 print("MongoDB 未連接")
                 return no_update, no_update, no_update
@@ -223,7 +225,7 @@ def register_stock_callbacks(app):
 
         try:
             print(f"開始刪除 UUID: {uuid_to_delete}")
-            mongo = MongoHandler()
+            mongo = get_mongo_handler()
             if not mongo.is_connected():
                 print("MongoDB 連接失敗")
                 raise PreventUpdate
@@ -254,6 +256,7 @@ def register_stock_callbacks(app):
                 print("更新失敗")
                 raise PreventUpdate
 
+            mongo.signal_symbol_change(symbol)
             print("刪除成功!")
             return {'status': 'success', 'timestamp': datetime.now().timestamp()}
             
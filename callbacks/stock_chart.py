@@ -3,79 +3,19 @@ from dash import Input, Output
 import plotly.graph_objects as go
 import pandas as pd
 
-import datetime
-from utils.helpers import safe_get
+from utils.chart_format import bars_to_columnar
 
-def get_data(data):
-    import datetime
 
-    data_dict = {}
-    chart_1m = safe_get(data, '1m_chart_data', [])
-    chart_5m = safe_get(data, '5m_chart_data', [])
-    chart_1d = safe_get(data, '1d_chart_data', [])
-
-    def filter_last_hour(chart_data, last_hour=3):
-        if not chart_data:
-            return []
-
-        # 轉換 datetime
-        for item in chart_data:
-            if isinstance(item['datetime'], str):
-                item['datetime'] = datetime.datetime.fromisoformat(item['datetime'])
-
-        # 找出最大時間點（最新時間）
-        latest_time = max(item['datetime'] for item in chart_data)
-        one_hour_ago = latest_time - datetime.timedelta(hours=last_hour)
-
-        # 過濾最後一小時的資料
-        return [item for item in chart_data if one_hour_ago <= item['datetime'] <= latest_time]
-
-    def filter_latest_day(chart_data):
-        if not chart_data:
-            return []
-
-        # 先將所有 datetime 轉為 datetime 對象
-        for item in chart_data:
-            if isinstance(item['datetime'], str):
-                item['datetime'] = datetime.datetime.fromisoformat(item['datetime'])
-
-        # 找出最新日期
-        latest_date = max(item['datetime'].date() for item in chart_data)
-
-        # 過濾該日期資料
-        return [item for item in chart_data if item['datetime'].date() == latest_date]
-
-    if chart_1d:
-        data_dict = {
-            '1min': filter_last_hour(chart_1m),
-            '5min': filter_latest_day(chart_5m),
-            '1day': chart_1d
-        }
-        print("使用真實 MongoDB 資料")
-    else:
-        print("找不到今天的 MongoDB 資料，使用假資料")
-        data_dict = {
-            '1min': [
-                {'datetime': datetime.datetime(2025, 5, 22, 13, 27), 'open': 0.41965, 'high': 0.41965, 'low': 0.41965, 'close': 0.41965, 'volume': 1.0},
-                {'datetime': datetime.datetime(2025, 5, 22, 13, 28), 'open': 0.42, 'high': 0.421, 'low': 0.419, 'close': 0.4205, 'volume': 5.0},
-            ],
-            '5min': [],
-            '1day': []
-        }
-
-    return data_dict
-
-
-def create_figure(data_list):
-    """創建 Plotly 蠟燭圖"""
-    df = pd.DataFrame(data_list)
+def create_figure(columns):
+    """創建 Plotly 蠟燭圖 (輸入為列式 K 線，見 utils/chart_format.py)"""
+    columns = bars_to_columnar(columns)
     fig = go.Figure(data=[
         go.Candlestick(
-            x=df['datetime'],
-            open=df['open'],
-            high=df['high'],
-            low=df['low'],
-            close=df['close'],
+            x=pd.to_datetime(columns['t'], unit='s'),
+            open=columns['o'],
+            high=columns['h'],
+            low=columns['l'],
+            close=columns['c'],
             name="Price"
         )
     ])
@@ -92,33 +32,18 @@ def create_figure(data_list):
 def register_stock_chart_callbacks(app):
 
     #region UPDATE CHART
-    # 回調函數們 - 統一使用 Plotly 圖表
+    # 三個圖表共用一個已過濾的 chart-data-store，一次回調更新
     @app.callback(
         Output('chart1-graph', 'figure'),
-        #Input('chart1-dropdown', 'value'),
-        Input("data-input-chart1", "data")
-        
-
-    )
-    def update_chart1(data):
-        """更新第一個圖表 (Plotly)"""
-        return create_figure(get_data(data)['1min'])
-
-    @app.callback(
         Output('chart2-graph', 'figure'),
-        #Input('chart2-dropdown', 'value'),
-        Input("data-input-chart2", "data")
-        
-    )
-    def update_chart2(data):
-        """更新第二個圖表 (Plotly)"""
-        return create_figure(get_data(data)['5min'])
-
-    @app.callback(
         Output('chart3-graph', 'figure'),
-        #Input('chart3-dropdown', 'value'),
-        Input("data-input-chart3", "data")
+        Input('chart-data-store', 'data')
     )
-    def update_chart3( data):
-        """更新第三個圖表 (Plotly)"""
-        return create_figure(get_data(data)['1day'])
\ No newline at end of file
+    def update_charts(chart_data):
+        """更新 1 分鐘 / 5 分鐘 / 日線圖表 (Plotly)"""
+        chart_data = chart_data or {}
+        return (
+            create_figure(chart_data.get('1min')),
+            create_figure(chart_data.get('5min')),
+            create_figure(chart_data.get('1day')),
+        )
@@ -74,6 +74,17 @@ def create_suggestion_card(data):
 
 
 #region Stock Card
+# create_stock_card 用到的字段，列表頁查詢只取這些 (不載入圖表數據)
+STOCK_CARD_FIELDS = {
+    'symbol': 1,
+    'name': 1,
+    'today_date': 1,
+    'day_close': 1,
+    'close_change_percentage': 1,
+    'sector': 1,
+    'float_risk': 1,
+}
+
 def create_stock_card(stock):
     """創建單個股票卡片組件"""
     change_percentage = safe_float(stock.get('close_change_percentage'), 0)
@@ -106,7 +117,7 @@ def create_stock_card(stock):
                 html.Div(safe_get(stock, 'float_risk'), className='metric-value')
             ], className='metric-container'),
         ], className='stock-metrics')
-    ], className='stock-card', id={'type': 'stock-card', 'index': safe_get(stock, 'symbol')})
+    ], className='stock-card', id={'type': 'stock-card', 'index': safe_get(stock, 'symbol'), 'date': safe_get(stock, 'today_date')})
 
 
 
@@ -2,30 +2,13 @@
 
 from dash import dcc, html
 from dash_tvlwc import Tvlwc
-from utils.helpers import safe_get
+from utils.helpers import safe_get, build_chart_payload
 
-from bson import ObjectId
-import datetime
 
-def serialize_mongo_doc(doc):
-    if isinstance(doc, list):
-        return [serialize_mongo_doc(i) for i in doc]
-    elif isinstance(doc, dict):
-        return {k: serialize_mongo_doc(v) for k, v in doc.items()}
-    elif isinstance(doc, ObjectId):
-        return str(doc)
-    elif isinstance(doc, datetime.datetime):
-        return doc.isoformat()
-    else:
-        return doc
-    
 def create_chart_container(interval='1min', name = "", chart_id='chart1', data=None, use_tvlwc=True):
     from dash import dcc, html
     from dash_tvlwc import Tvlwc
 
-    symbol = safe_get(data, 'symbol')
-    clean_data = serialize_mongo_doc(data)
-
     """ dcc.Dropdown(
                     id=f"{chart_id}-dropdown",
                     options=[
@@ -39,7 +22,6 @@ def create_chart_container(interval='1min', name = "", chart_id='chart1', data=N
                 ) """
 
     return html.Div([
-        dcc.Store(id=f"data-input-{chart_id}", data=clean_data),
         html.Div([
             html.Div([
                 html.H5(f"{name.upper()}", className="card-title"),
@@ -59,7 +41,10 @@ def create_chart_container(interval='1min', name = "", chart_id='chart1', data=N
 
 
 def create_row_chart_container(data):
-    return html.Div([html.Div([
+    # 三個圖表只共用一份已按時間框架過濾的 K 線數據
+    return html.Div([
+        dcc.Store(id='chart-data-store', data=build_chart_payload(data)),
+        html.Div([
             create_chart_container('1min', name = "1 MIN (last 3 hrs)", chart_id='chart1', data=data, use_tvlwc=False),
             create_chart_container('5min', name = "5 MIN", chart_id='chart2', data=data, use_tvlwc=False),
             
@@ -0,0 +1,41 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+
+from _mongo import TRADING_DATES_COLLECTION, get_mongo_handler
+
+
+# 從 fundamentals_of_top_list_symbols 的歷史數據重建 trading_dates 目錄
+# (/api/stocks/available_dates 從這個目錄讀取)。可以重複執行，每個日期都是 upsert。
+# 用法:
+#   python dev_test/backfill_trading_dates.py
+#   python dev_test/backfill_trading_dates.py --date 2025-05-22   # 只重新統計一天
+#   python dev_test/backfill_trading_dates.py --reconcile         # 只補齊缺少的日期、刪除已經沒有數據的日期
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the trading_dates catalog from history")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--date", help="只重新統計這個日期 (YYYY-MM-DD)")
+    group.add_argument("--reconcile", action="store_true", help="只對齊目錄和源集合的日期 (API 後台任務也會定時執行)")
+    args = parser.parse_args()
+
+    handler = get_mongo_handler()
+    if not handler.is_connected():
+        print("無法連接到 MongoDB，請檢查 MONGODB_CONNECTION_STRING")
+        sys.exit(1)
+
+    if args.date:
+        entries = handler.refresh_trading_dates({args.date})
+        if entries is None:
+            sys.exit(1)
+        print(f"{args.date}: {entries[0]}" if entries else f"{args.date}: 沒有數據，已從目錄中移除")
+        sys.exit(0)
+
+    entries = handler.reconcile_trading_dates() if args.reconcile else handler.refresh_trading_dates()
+    if entries is None:
+        sys.exit(1)
+    print(f"{TRADING_DATES_COLLECTION}: 寫入 {len(entries)} 個交易日")
+    for entry in handler.trading_dates()[:5]:
+        print(f"  {entry['date']}: {entry['symbol_count']} symbols, top mover {entry['top_mover']}")
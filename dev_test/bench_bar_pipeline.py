@@ -0,0 +1,139 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from api.services.fastapi_utils import prepare_chart_payload, prepare_tvlwc_data, filter_chart_data
+
+
+# K 線處理的 micro-benchmark: 合成 1m / 5m / 1d 數據 (1k, 10k, 100k 根)，
+# 比較舊版逐根循環 / pandas 實現和 NumPy 版本的耗時。
+# 用法:
+#   python dev_test/bench_bar_pipeline.py --save bench_bars.json
+#   python dev_test/bench_bar_pipeline.py --compare bench_bars.json --tolerance 1.3
+
+SIZES = (1_000, 10_000, 100_000)
+STEPS = {'1min': timedelta(minutes=1), '5min': timedelta(minutes=5), '1day': timedelta(days=1)}
+
+
+def synthetic_bars(interval, count):
+    """生成以現在為結束時間的 K 線 (datetime 為 ISO 字串，和 MongoDB 中一樣)"""
+    step = STEPS[interval]
+    start = datetime.now().replace(second=0, microsecond=0) - step * count
+    bars = []
+    price = 1.0
+    for i in range(count):
+        price = max(0.01, price + ((i * 7919) % 13 - 6) * 0.001)
+        bars.append({
+            'datetime': (start + step * i).isoformat(),
+            'open': price,
+            'high': price * 1.01,
+            'low': price * 0.99,
+            'close': price * 1.002,
+            'volume': float(1000 + i % 500),
+        })
+    return bars
+
+
+#region Legacy
+def legacy_prepare_tvlwc_data(chart_data):
+    formatted_data = []
+    for item in chart_data:
+        if isinstance(item.get('datetime'), str):
+            try:
+                dt = datetime.fromisoformat(item['datetime'])
+            except ValueError:
+                continue
+        else:
+            dt = item.get('datetime')
+        if not dt:
+            continue
+        formatted_data.append({
+            'time': dt.isoformat(),
+            'open': float(item.get('open', 0)),
+            'high': float(item.get('high', 0)),
+            'low': float(item.get('low', 0)),
+            'close': float(item.get('close', 0)),
+            'volume': float(item.get('volume', 0))
+        })
+    return formatted_data
+
+
+def legacy_filter_chart_data(chart_data, interval):
+    df = pd.DataFrame(chart_data)
+    if not pd.api.types.is_datetime64_any_dtype(df['datetime']):
+        df['datetime'] = pd.to_datetime(df['datetime'])
+    now = datetime.now()
+    if interval == '1min':
+        df = df[df['datetime'] >= now - timedelta(hours=3)]
+    elif interval == '5min':
+        df = df[df['datetime'].dt.date == now.date()]
+    elif interval == '1day':
+        df = df[df['datetime'] >= now - timedelta(days=30)]
+    df = df.sort_values('datetime')
+    return df.to_dict('records')
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(repeat):
+    results = {}
+    print(f"{'case':<22}{'legacy ms':>12}{'numpy ms':>12}{'speedup':>10}")
+    for interval in STEPS:
+        for size in SIZES:
+            bars = synthetic_bars(interval, size)
+            cases = {
+                'prepare': (lambda: legacy_prepare_tvlwc_data(bars), lambda: prepare_tvlwc_data(bars)),
+                'filter': (lambda: legacy_filter_chart_data(bars, interval), lambda: filter_chart_data(bars, interval)),
+                'endpoint': (
+                    lambda: legacy_prepare_tvlwc_data(legacy_filter_chart_data(bars, interval)),
+                    lambda: prepare_chart_payload(bars, interval),
+                ),
+            }
+            for name, (legacy_fn, new_fn) in cases.items():
+                key = f"{name}/{interval}/{size}"
+                legacy_ms = timed(legacy_fn, repeat)
+                new_ms = timed(new_fn, repeat)
+                results[key] = new_ms
+                print(f"{key:<22}{legacy_ms:>12.2f}{new_ms:>12.2f}{legacy_ms / new_ms:>9.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bar pipeline micro-benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="把 NumPy 版耗時保存為 JSON baseline")
+    parser.add_argument("--compare", help="和之前保存的 baseline 比較")
+    parser.add_argument("--tolerance", type=float, default=1.3, help="超過 baseline 多少倍算退化")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = [
+            (key, baseline[key], ms) for key, ms in results.items()
+            if key in baseline and ms > baseline[key] * args.tolerance
+        ]
+        for key, before, after in regressions:
+            print(f"REGRESSION {key}: {before:.2f}ms -> {after:.2f}ms")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,106 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from api.services.fastapi_utils import prepare_chart_payload
+from api.services.mongo_json import dumps_mongo
+from utils.compression import brotli, compress_body
+
+
+# 響應壓縮的 micro-benchmark: 按端點生成典型的響應 body，
+# 比較不同 gzip level / brotli quality 的壓縮後大小和 CPU 耗時。
+# 用法: python dev_test/bench_compression.py --repeat 5
+
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 6, 11)
+
+
+def synthetic_bars(step, count):
+    end = datetime(2025, 5, 22, 16, 0)
+    price = 1.0
+    bars = []
+    for i in range(count):
+        price = max(0.01, price + ((i * 7919) % 13 - 6) * 0.001)
+        bars.append({
+            'datetime': (end - step * (count - 1 - i)).isoformat(),
+            'open': price,
+            'high': price * 1.01,
+            'low': price * 0.99,
+            'close': price * 1.002,
+            'volume': float(1000 + i % 500),
+        })
+    return bars
+
+
+def synthetic_stock(index, bars_1m):
+    return {
+        '_id': ObjectId(),
+        'symbol': f"SYM{index}",
+        'name': f"Synthetic Holdings {index}",
+        'today_date': '2025-05-22',
+        'day_close': 1.23 + index * 0.01,
+        'yesterday_close': 1.01,
+        'close_change_percentage': 21.78 + index,
+        'high_change_percentage': 35.5 + index,
+        'day_high': 1.5,
+        'day_low': 0.98,
+        'float_risk': 'High' if index % 2 else 'Low',
+        'short_signal': index % 3 == 0,
+        'sector': 'Healthcare' if index % 2 else 'Technology',
+        'suggestion': "Gap up on news, watch the VWAP reclaim and the pre-market high. " * 4,
+        'raw_news': [{'uuid': str(i), 'text': f"Headline number {i} about SYM{index}", 'summary': "..."} for i in range(10)],
+        '1m_chart_data': bars_1m,
+    }
+
+
+def endpoint_bodies():
+    history_1m = synthetic_bars(timedelta(minutes=1), 16 * 60)
+    history_1d = synthetic_bars(timedelta(days=1), 365)
+    list_fields = ('_id', 'symbol', 'name', 'today_date', 'day_close', 'yesterday_close',
+                   'close_change_percentage', 'high_change_percentage', 'day_high', 'day_low',
+                   'float_risk', 'short_signal', 'sector')
+    stocks = [synthetic_stock(i, []) for i in range(500)]
+    return {
+        '/stocks/{symbol}/chart 1m rows': {'data': prepare_chart_payload(history_1m, '1m', 'rows')},
+        '/stocks/{symbol}/chart 1m columnar': {'data': prepare_chart_payload(history_1m, '1m', 'columnar')},
+        '/stocks/{symbol}/chart 1d rows': {'data': prepare_chart_payload(history_1d, '1d', 'rows')},
+        '/stocks/{symbol} (full doc)': synthetic_stock(0, history_1m),
+        '/api/stocks/latest_day (500)': {'data': [{k: s[k] for k in list_fields} for s in stocks]},
+    }
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Response compression micro-benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    settings = [('gzip', level, None) for level in GZIP_LEVELS]
+    if brotli is not None:
+        settings += [('br', None, quality) for quality in BROTLI_QUALITIES]
+    else:
+        print("brotli 未安裝，只測試 gzip")
+
+    for endpoint, content in endpoint_bodies().items():
+        body = dumps_mongo(content)
+        print(f"\n{endpoint}: {len(body):,} bytes uncompressed")
+        print(f"  {'encoding':<12}{'bytes':>12}{'ratio':>9}{'ms':>9}")
+        for encoding, level, quality in settings:
+            compressed, ms = timed(lambda: compress_body(body, encoding, level, quality), args.repeat)
+            name = f"{encoding}-{level if encoding == 'gzip' else quality}"
+            print(f"  {name:<12}{len(compressed):>12,}{len(body) / len(compressed):>8.1f}x{ms:>9.2f}")
@@ -0,0 +1,81 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId, json_util
+from fastapi.responses import JSONResponse
+
+from api.services.mongo_json import MongoJSONResponse, orjson
+
+
+# API 響應編碼的 micro-benchmark: 合成帶大量 K 線的 fundamentals 文檔，
+# 比較舊的 json.loads(json_util.dumps(doc)) + JSONResponse 和 MongoJSONResponse 一次編碼的耗時，
+# 並確認兩者輸出相同。
+# 用法: python dev_test/bench_json_encoding.py --docs 20 --bars 5000
+
+def synthetic_doc(index, bars):
+    end = datetime(2025, 5, 22, 16, 0)
+    return {
+        '_id': ObjectId(),
+        'symbol': f"SYM{index}",
+        'name': f"Synthetic {index}",
+        'today_date': '2025-05-22',
+        'close_change_percentage': 12.5 + index,
+        'market_cap_float': 1.5e8 + index,
+        'updated_at': end,
+        'raw_news': [{'title': f"news {i}", 'published': end - timedelta(hours=i)} for i in range(20)],
+        '1m_chart_data': [
+            {
+                'datetime': end - timedelta(minutes=bars - i),
+                'open': 1.0 + i * 0.001,
+                'high': 1.1 + i * 0.001,
+                'low': 0.9 + i * 0.001,
+                'close': 1.05 + i * 0.001,
+                'volume': 1000.0 + i,
+            }
+            for i in range(bars)
+        ],
+    }
+
+
+def legacy_render(data):
+    return JSONResponse(content=json.loads(json_util.dumps(data))).body
+
+
+def new_render(data):
+    return MongoJSONResponse(content=data).body
+
+
+def timed(fn, data, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON encoding micro-benchmark")
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--bars", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = {'count': args.docs, 'data': [synthetic_doc(i, args.bars) for i in range(args.docs)]}
+
+    same = json.loads(legacy_render(data)) == json.loads(new_render(data))
+    legacy_ms = timed(legacy_render, data, args.repeat)
+    new_ms = timed(new_render, data, args.repeat)
+
+    print(f"encoder: {'orjson' if orjson is not None else 'json (stdlib)'}")
+    print(f"payload: {args.docs} docs x {args.bars} bars, {len(new_render(data)):,} bytes")
+    print(f"json_util round trip: {legacy_ms:>10.2f} ms")
+    print(f"MongoJSONResponse:    {new_ms:>10.2f} ms ({legacy_ms / new_ms:.1f}x)")
+    print(f"output identical: {same}")
+    sys.exit(0 if same else 1)
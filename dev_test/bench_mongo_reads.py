@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+
+from _mongo import get_mongo_handler
+
+
+# 比較 MongoHandler 讀取的吞吐量:
+#   before: 每次讀取前 ping + list_collection_names (舊版 hot path，三次 round trip)
+#   after : MongoHandler.find_one (連接狀態 + 集合緩存，一次 round trip)
+# 用法: python dev_test/bench_mongo_reads.py --seconds 5 --symbol AAPL
+
+
+def legacy_find_one(handler, collection_name, query, projection):
+    handler.client.admin.command('ping')
+    if collection_name not in handler.db.list_collection_names():
+        return None
+    return handler.db[collection_name].find_one(query, projection)
+
+
+def run(label, fn, seconds):
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        fn()
+        count += 1
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else 0
+    print(f"{label:<8} {count:>8} reads in {elapsed:.2f}s -> {rate:,.1f} reads/s")
+    return rate
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MongoHandler read benchmark")
+    parser.add_argument("--collection", default="fundamentals_of_top_list_symbols")
+    parser.add_argument("--symbol", default=None, help="查詢的股票代碼 (預設: 任意文檔)")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    handler = get_mongo_handler()
+    if not handler.is_connected():
+        print("無法連接到 MongoDB，請檢查 MONGODB_CONNECTION_STRING")
+        sys.exit(1)
+
+    query = {"symbol": args.symbol} if args.symbol else {}
+    projection = {"symbol": 1, "today_date": 1}
+
+    # 預熱連接池和集合緩存
+    handler.find_one(args.collection, query, projection)
+
+    before = run("before", lambda: legacy_find_one(handler, args.collection, query, projection), args.seconds)
+    after = run("after", lambda: handler.find_one(args.collection, query, projection), args.seconds)
+
+    if before:
+        print(f"speedup: {after / before:.2f}x")
+    print(f"pool: {handler.pool_stats()}")
@@ -0,0 +1,86 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+from datetime import datetime, timedelta, timezone
+
+from api.services.fastapi_utils import prepare_chart_payload
+from utils.helpers import build_chart_payload
+from utils.timeframes import TIMEFRAMES
+
+
+# 檢查每個時間框架截取窗口後的 K 線數量和響應大小。
+# 合成 10 天 1 分鐘 / 5 分鐘 K 線和 1 年日線，確認 /chart 和 Dash 詳情頁只輸出窗口內的數據。
+# 用法: python dev_test/check_chart_sizes.py
+
+HISTORY = {
+    '1m': (timedelta(minutes=1), 10 * 24 * 60),
+    '5m': (timedelta(minutes=5), 10 * 24 * 12),
+    '1d': (timedelta(days=1), 365),
+}
+
+# 每個窗口最多的 K 線數量
+MAX_BARS = {
+    '1m': 3 * 60 + 1,
+    '5m': 24 * 12,
+    '1d': 30 + 1,
+}
+
+
+def synthetic_history(step, count):
+    end = datetime(2025, 5, 22, 16, 0)
+    return [
+        {
+            'datetime': (end - step * (count - 1 - i)).isoformat(),
+            'open': 1.0 + i * 0.001,
+            'high': 1.1 + i * 0.001,
+            'low': 0.9 + i * 0.001,
+            'close': 1.05 + i * 0.001,
+            'volume': 1000.0 + i,
+        }
+        for i in range(count)
+    ]
+
+
+if __name__ == "__main__":
+    failed = False
+    doc = {}
+    for timeframe, (step, count) in HISTORY.items():
+        history = synthetic_history(step, count)
+        doc[TIMEFRAMES[timeframe]['field']] = history
+        full_size = len(json.dumps(history))
+
+        for format in ('rows', 'columnar'):
+            payload = prepare_chart_payload(history, timeframe, format)
+            bars = len(payload['t']) if format == 'columnar' else len(payload)
+            size = len(json.dumps(payload))
+            ok = 0 < bars <= MAX_BARS[timeframe]
+            failed = failed or not ok
+            print(f"{'OK  ' if ok else 'FAIL'} /chart {timeframe} {format:<9} "
+                  f"{bars:>6} bars {size:>9,} bytes (full history {count} bars {full_size:,} bytes)")
+
+    # 帶時區的 K 線: rows 格式保留原來的偏移，5m 的交易日按 K 線自己的時區截取
+    # (21:00-04:00 已經是 UTC 的第二天，按 UTC 截取會丟掉當天 09:30 開始的 K 線)
+    eastern = timezone(timedelta(hours=-4))
+    aware = [
+        {**bar, 'datetime': (datetime(2025, 5, day, 9, 30, tzinfo=eastern) + timedelta(minutes=5 * i)).isoformat()}
+        for day in (21, 22)
+        for i, bar in enumerate(synthetic_history(timedelta(minutes=5), 11 * 12 + 7))
+    ]
+    payload = prepare_chart_payload(aware, '5m', 'rows')
+    times = [bar['time'] for bar in payload]
+    ok = bool(times) and times[0] == '2025-05-22T09:30:00-04:00' and times[-1] == '2025-05-22T21:00:00-04:00'
+    failed = failed or not ok
+    print(f"{'OK  ' if ok else 'FAIL'} /chart 5m rows tz-aware {len(times)} bars "
+          f"{times[0] if times else None} .. {times[-1] if times else None}")
+
+    store = build_chart_payload(doc)
+    for timeframe, config in TIMEFRAMES.items():
+        bars = len(store[config['store_key']]['t'])
+        ok = 0 < bars <= MAX_BARS[timeframe]
+        failed = failed or not ok
+        print(f"{'OK  ' if ok else 'FAIL'} dash   {config['store_key']:<5} {bars:>6} bars")
+    print(f"dash chart-data-store: {len(json.dumps(store)):,} bytes")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,132 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+
+from bson import ObjectId
+
+from _mongo import get_mongo_handler
+from api.run_fastapi import batch_pipeline
+from api.services.pagination import keyset_pipeline
+from callbacks.main import date_cards_pipeline
+from utils.timeframes import chart_window_pipeline
+
+
+# 用 explain 檢查每個 API 端點的查詢是否走索引 (IXSCAN / DISTINCT_SCAN)，
+# 而不是全表掃描 (COLLSCAN)。
+# 用法: python dev_test/check_index_plans.py --symbol AAPL --date 2025-05-22
+
+COLLECTION_NAME = "fundamentals_of_top_list_symbols"
+
+
+def collect_stages(plan, stages=None):
+    """遞歸收集 explain 結果中所有的 stage 名稱"""
+    if stages is None:
+        stages = []
+    if isinstance(plan, dict):
+        stage = plan.get("stage")
+        if isinstance(stage, str):
+            stages.append(stage)
+        for key, value in plan.items():
+            # rejectedPlans 不是實際執行的計劃
+            if key != "rejectedPlans":
+                collect_stages(value, stages)
+    elif isinstance(plan, list):
+        for item in plan:
+            collect_stages(item, stages)
+    return stages
+
+
+def explain_find(collection, query, sort=None, limit=0):
+    cursor = collection.find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor.explain()
+
+
+def explain_aggregate(db, pipeline):
+    return db.command("aggregate", COLLECTION_NAME, pipeline=pipeline, explain=True)
+
+
+def explain_distinct(db, key, query=None):
+    return db.command({"explain": {"distinct": COLLECTION_NAME, "key": key, "query": query or {}}})
+
+
+def endpoint_plans(db, symbol, date):
+    collection = db[COLLECTION_NAME]
+    return {
+        "GET /stocks/{symbol}?date": explain_find(collection, {"symbol": symbol, "today_date": date}, limit=1),
+        "GET /stocks/{symbol} (latest)": explain_find(collection, {"symbol": symbol}, sort=[("today_date", -1)], limit=1),
+        "GET /stocks/{symbol}/chart": explain_aggregate(
+            db, chart_window_pipeline({"symbol": symbol}, ["1m"], fields=["symbol", "today_date"])),
+        "POST /stocks/batch": explain_aggregate(
+            db, batch_pipeline([symbol, "TSLA"], None, ["fundamentals", "chart"], "5m")),
+        "POST /stocks/batch?date": explain_aggregate(
+            db, batch_pipeline([symbol, "TSLA"], date, ["price_overview"], "5m")),
+        "GET /stocks/?date": explain_aggregate(db, keyset_pipeline({"today_date": date}, limit=50)),
+        "GET /stocks/?cursor": explain_aggregate(db, keyset_pipeline({}, (date, 10.0, ObjectId()), limit=50)),
+        "GET /top-movers (close)": explain_aggregate(db, [
+            {"$match": {"today_date": date}},
+            {"$sort": {"close_change_percentage": -1}},
+            {"$limit": 10},
+        ]),
+        "GET /top-movers (high)": explain_aggregate(db, [
+            {"$match": {"today_date": date}},
+            {"$sort": {"high_change_percentage": -1}},
+            {"$limit": 10},
+        ]),
+        "GET /top-movers (no date)": explain_aggregate(db, [
+            {"$match": {}},
+            {"$sort": {"close_change_percentage": -1}},
+            {"$limit": 10},
+        ]),
+        "GET /api/stocks/latest_day (date)": explain_find(collection, {}, sort=[("today_date", -1)], limit=1),
+        "GET /api/stocks/latest_day?cursor": explain_aggregate(
+            db, keyset_pipeline({"today_date": date}, (date, 10.0, ObjectId()), limit=50)),
+        "GET /api/stocks/latest_day (total)": explain_aggregate(db, [
+            {"$match": {"today_date": date}},
+            {"$count": "count"},
+        ]),
+        "GET /api/stocks/by_date": explain_aggregate(db, keyset_pipeline({"today_date": date}, limit=50)),
+        "GET /api/stocks/by_date?cursor": explain_aggregate(
+            db, keyset_pipeline({"today_date": date}, (date, 10.0, ObjectId()), limit=50)),
+        "GET /api/stocks/available_dates": explain_distinct(db, "today_date"),
+        "Dash list page (date tab)": explain_aggregate(db, date_cards_pipeline({"date": date, "sort": "desc"})),
+        "Dash list page (filtered, asc, cursor)": explain_aggregate(db, date_cards_pipeline(
+            {"date": date, "sort": "asc", "sector": ["Technology"]}, (date, 10.0, ObjectId()))),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that every endpoint query uses an index")
+    parser.add_argument("--symbol", default="AAPL")
+    parser.add_argument("--date", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--ensure", action="store_true", help="先建立 INDEX_REGISTRY 中的索引")
+    args = parser.parse_args()
+
+    handler = get_mongo_handler()
+    if not handler.is_connected():
+        print("無法連接到 MongoDB，請檢查 MONGODB_CONNECTION_STRING")
+        sys.exit(1)
+
+    if args.ensure:
+        print(f"ensure_indexes: {handler.ensure_indexes()}")
+
+    failed = []
+    for name, plan in endpoint_plans(handler.db, args.symbol.upper(), args.date).items():
+        stages = collect_stages(plan)
+        ok = "COLLSCAN" not in stages and any(s in stages for s in ("IXSCAN", "DISTINCT_SCAN", "COUNT_SCAN"))
+        print(f"{'OK  ' if ok else 'FAIL'} {name:<36} {' > '.join(stages)}")
+        if not ok:
+            failed.append(name)
+
+    for collection_name, report in handler.index_report().items():
+        print(f"\n{collection_name}")
+        print(f"  missing:    {report['missing']}")
+        print(f"  undeclared: {report['undeclared']}")
+        print(f"  unused:     {report['unused']}")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,147 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+
+from api.services.pagination import encode_cursor
+from callbacks.main import live_update_patches
+
+
+# 檢查列表頁實時更新 (callbacks/main.py 的 live_update_patches) 生成的 Patch:
+# 把 Patch 套用到頁面上的卡片順序，和按排序重新渲染的結果比較。
+# 包括同一批中多個事件 (upsert / delete / 同一日期的重新排序)、過濾條件、升序、空列表。
+# 用法: python dev_test/check_live_patches.py --random 500
+
+DATE = '2025-05-22'
+
+
+def card(symbol, value, sector='Technology'):
+    doc_id = f"{int(symbol[1:]):024x}"
+    return {'_id': doc_id, 'symbol': symbol, 'today_date': DATE, 'close_change_percentage': value,
+            'sector': sector, 'float_risk': 'High', 'name': symbol, 'day_close': 1.0}
+
+
+def apply_patch(symbols, patch):
+    """模擬瀏覽器端套用 Patch，返回新的 symbol 順序"""
+    symbols = list(symbols)
+    for operation in patch.to_plotly_json()['operations']:
+        if operation['operation'] == 'Delete':
+            del symbols[operation['location'][0]]
+        elif operation['operation'] == 'Insert':
+            symbols.insert(operation['params']['index'], operation['params']['value'].id['index'])
+        elif operation['operation'] == 'Assign':
+            symbols[operation['location'][0]] = operation['params']['value'].id['index']
+        else:
+            raise ValueError(f"unexpected operation {operation['operation']}")
+    return symbols
+
+
+def run_batch(displayed, values, events, view=None):
+    """displayed: 頁面上的 symbol 順序，values: 這批事件之後的 {symbol: card}"""
+    list_ids = [{'type': 'stock-list', 'index': DATE}]
+    card_ids = [{'type': 'stock-card', 'index': symbol, 'date': DATE} for symbol in displayed]
+    known = {(DATE, symbol): c for symbol, c in values.items()}
+    patches = live_update_patches(events, list_ids, card_ids, known, view)
+    return apply_patch(displayed, patches[DATE]) if DATE in patches else list(displayed)
+
+
+def expected_order(values, view=None):
+    view = view or {}
+    descending = view.get('sort', 'desc') == 'desc'
+    cards = [c for c in values.values() if not view.get('sector') or c['sector'] in view['sector']]
+    cards.sort(key=lambda c: c['close_change_percentage'], reverse=descending)
+    return [c['symbol'] for c in cards]
+
+
+def check(name, result, expected):
+    status = 'OK' if result == expected else 'FAIL'
+    print(f"{status:<5}{name}: {result}" + ('' if result == expected else f" (expected {expected})"))
+    return result == expected
+
+
+def fixed_cases():
+    ok = True
+    before = {s: card(s, v) for s, v in [('S1', 10), ('S0', 9), ('S3', 8), ('S2', 7), ('S5', 6), ('S4', 5)]}
+    displayed = expected_order(before)
+
+    after = dict(before)
+    after.pop('S5')
+    after['S6'] = card('S6', 0.0)
+    after['S1'] = card('S1', 20)
+    events = [{'op': 'upsert', 'card': after['S6']}, {'op': 'delete', 'card': before['S5']},
+              {'op': 'upsert', 'card': after['S1']}]
+    ok &= check('upsert + delete + re-rank in one batch', run_batch(displayed, after, events), expected_order(after))
+
+    after = dict(before)
+    after['S4'] = card('S4', 9.5)
+    after['S0'] = card('S0', 4)
+    events = [{'op': 'upsert', 'card': after['S4']}, {'op': 'upsert', 'card': after['S0']}]
+    ok &= check('two cards swap places', run_batch(displayed, after, events), expected_order(after))
+
+    after = dict(before)
+    after['S3'] = card('S3', 8, sector='Healthcare')
+    view = {'sort': 'desc', 'sector': ['Technology']}
+    events = [{'op': 'upsert', 'card': after['S3']}]
+    ok &= check('card leaves the filter', run_batch(displayed, after, events, view), expected_order(after, view))
+
+    view = {'sort': 'asc'}
+    after = dict(before)
+    after['S2'] = card('S2', -1)
+    events = [{'op': 'upsert', 'card': after['S2']}]
+    ok &= check('ascending sort', run_batch(expected_order(before, view), after, events, view),
+                expected_order(after, view))
+
+    after = {'S9': card('S9', 3)}
+    events = [{'op': 'upsert', 'card': after['S9']}]
+    ok &= check('empty list receives inserts', run_batch([], after, events), ['S9'])
+
+    # 已载入到 S4 (5.0)，下一页从 cursor 开始
+    view = {'sort': 'desc', 'has_more': True, 'cursor': encode_cursor(before['S4'])}
+    after = dict(before)
+    after['S7'] = card('S7', 1)
+    events = [{'op': 'upsert', 'card': after['S7']}]
+    ok &= check('insert past the cursor is deferred', run_batch(displayed, after, events, view), displayed)
+
+    # S4 移到前面后，5.0 和 cursor 之间的新卡片仍然属于已载入部分，插在末尾
+    after = dict(before)
+    after['S4'] = card('S4', 30)
+    after['S8'] = card('S8', 5.5)
+    events = [{'op': 'upsert', 'card': after['S4']}, {'op': 'upsert', 'card': after['S8']}]
+    ok &= check('insert before the cursor at the end of the page', run_batch(displayed, after, events, view),
+                expected_order(after))
+    return ok
+
+
+def random_cases(count):
+    ok = True
+    rng = random.Random(7)
+    for case in range(count):
+        before = {f"S{i}": card(f"S{i}", round(rng.uniform(-20, 80), 2)) for i in range(rng.randint(0, 15))}
+        displayed = expected_order(before)
+        after = dict(before)
+        events = []
+        for _ in range(rng.randint(1, 8)):
+            symbol = f"S{rng.randint(0, 20)}"
+            if symbol in after and rng.random() < 0.3:
+                events.append({'op': 'delete', 'card': after.pop(symbol)})
+            else:
+                after[symbol] = card(symbol, round(rng.uniform(-20, 80), 2))
+                events.append({'op': 'upsert', 'card': after[symbol]})
+        result = run_batch(displayed, after, events)
+        if result != expected_order(after):
+            ok &= check(f"random batch {case}", result, expected_order(after))
+    print(f"{'OK' if ok else 'FAIL':<5}{count} random batches")
+    return ok
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check live update patches against a full re-render")
+    parser.add_argument("--random", type=int, default=200, help="隨機批次的數量")
+    args = parser.parse_args()
+
+    passed = fixed_cases()
+    passed &= random_cases(args.random)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,88 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+
+import httpx
+
+
+# FastAPI 併發壓測: 同時發送慢查詢 (available_dates) 和快查詢 (/health, /stocks/{symbol})，
+# 統計吞吐量和每個路徑的延遲。同步 driver 時慢查詢會阻塞事件循環，快查詢的延遲會跟著變高；
+# 異步 driver 時快查詢不受影響。
+# 用法 (先啟動 api/run_fastapi.py):
+#   python dev_test/load_test_api.py --url http://127.0.0.1:8000 --requests 500 --concurrency 50
+#   python dev_test/load_test_api.py --path /api/stocks/available_dates --path /health
+
+DEFAULT_PATHS = [
+    "/api/stocks/available_dates",
+    "/api/stocks/latest_day",
+    "/health",
+    "/stocks/?limit=20",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run(url, paths, total, concurrency, timeout):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(paths[i % len(paths)])
+
+    async def worker(client):
+        while True:
+            try:
+                path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 500:
+                    errors[path] += 1
+            except httpx.HTTPError:
+                errors[path] += 1
+            latencies[path].append((time.perf_counter() - start) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, errors, elapsed
+
+
+def report(latencies, errors, elapsed, total, concurrency):
+    print(f"{total} requests, concurrency {concurrency}: {elapsed:.2f}s, {total / elapsed:.1f} req/s")
+    print(f"{'path':<40}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for path, values in latencies.items():
+        print(f"{path:<40}{len(values):>7}{errors[path]:>8}"
+              f"{percentile(values, 50):>10.1f}{percentile(values, 95):>10.1f}"
+              f"{percentile(values, 99):>10.1f}{max(values):>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FastAPI concurrent load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", action="append", help="要請求的路徑 (可重複)，默認為混合的快 / 慢查詢")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    paths = args.path or DEFAULT_PATHS
+    latencies, errors, elapsed = asyncio.run(run(args.url, paths, args.requests, args.concurrency, args.timeout))
+    report(latencies, errors, elapsed, args.requests, args.concurrency)
+    sys.exit(1 if any(errors.values()) else 0)
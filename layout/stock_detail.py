@@ -19,24 +19,8 @@ from components.components_stock_charts import create_row_chart_container
 from utils.helpers import safe_float
 
 from utils.helpers import safe_get, safe_float
-import json
-from utils.helpers import JSONEncoder
-from bson import ObjectId
-import datetime
-
-
-def serialize_mongo_doc(doc):
-    if isinstance(doc, list):
-        return [serialize_mongo_doc(i) for i in doc]
-    elif isinstance(doc, dict):
-        return {k: serialize_mongo_doc(v) for k, v in doc.items()}
-    elif isinstance(doc, ObjectId):
-        return str(doc)
-    elif isinstance(doc, datetime.datetime):
-        return doc.isoformat()
-    else:
-        return doc
-    
+from utils.serialization import to_jsonable
+
 
 #region Create Stock Detail Page
 def create_stock_detail_page(data):
@@ -51,23 +35,8 @@ def create_stock_detail_page(data):
     market_cap_formatted = f"${market_cap/1000000:.2f}M" if market_cap else "N/A"
 
 
-    
-    _1m_chart_data = safe_get(data,'1m_chart_data',[])
-    #print(data['1m_chart_data'])
-    #print(_1m_chart_data)
-    _5m_chart_data = safe_get(data,'1m_chart_data',[])
-    _1d_chart_data = safe_get(data,'1m_chart_data',[])
-    data_dict = {
-    '1min': _1m_chart_data,
-    '5min': _5m_chart_data,
-    '1day': _1d_chart_data
-}
-
-    
     # 把完整数据存入 Store，给后续callback用
-    clean_data_dict_json = json.dumps(data_dict, cls=JSONEncoder)  # 把dict转成json字符串 """
-
-    clean_data = serialize_mongo_doc(data)
+    clean_data = to_jsonable(data)
 
 
 
@@ -1,8 +1,6 @@
 from dash import html, dcc
 from components.navigation import create_header, create_footer
 from components.cards import create_stock_card
-from utils.helpers import safe_get
-from collections import defaultdict
 from datetime import datetime
 # 匯入策略頁面函式
 from layout.strategy_list import strategy_list_page
@@ -10,17 +8,14 @@ from layout.strategy_list import strategy_list_page
 title = "貓咪神-短炒Scanner"
 page_title = "喵喵熱股追蹤"
 
+# 卡片列表的排序選項 (排序和過濾都在服務器端完成，見 callbacks/main.py 的 query_date_cards)
+SORT_OPTIONS = [
+    {'label': 'Change % ↓', 'value': 'desc'},
+    {'label': 'Change % ↑', 'value': 'asc'},
+]
 
 
 
-def group_stocks_by_date(stocks_data):
-    """將股票數據按日期分組"""
-    grouped = defaultdict(list)
-    for stock in stocks_data:
-        date = stock.get('today_date')
-        if date:
-            grouped[date].append(stock)
-    return grouped
 
 def format_date_tab(date_str):
     """格式化日期顯示"""
@@ -30,56 +25,88 @@ def format_date_tab(date_str):
     except:
         return date_str
 
-def create_tabs_for_stocks(stocks_data):
-    """創建包含多個日期標籤的頁面"""
-    grouped_stocks = group_stocks_by_date(stocks_data)
-    if not grouped_stocks:
-        return create_empty_state("No date available")
-    
-    # 按日期降序排序
-    sorted_dates = sorted(grouped_stocks.keys(), reverse=True)
-    
-    tabs = []
+def create_strategy_tab_content():
+    """策略整理標籤的內容"""
+    return html.Div([
+        html.H2("策略一覽", style={'margin': '10px auto', 'color': 'white', 'maxWidth': '1200px'}),
+        strategy_list_page()
+    ])
 
-    # ➊ 加入策略整理頁面為第一個 Tab
-    tabs.append(dcc.Tab(
-        label="🧠 策略整理",
-        value="strategy",
-        children=html.Div([
-            html.H2("策略一覽", style={'margin': '10px auto', 'color': 'white', 'maxWidth': '1200px'}),
-            strategy_list_page()
-        ])
-    ))
-    
-    for date in sorted_dates:
-        stocks = grouped_stocks[date]
-        tab_content = html.Div([
-            html.H2(f"{page_title} - {date}", style={'margin-bottom': '20px', 'margin-left': '30px'}),
-            html.Div(
-                [create_stock_card(stock) for stock in stocks],
-                className='stock-list'
-            )
-        ])
-        
-        tabs.append(dcc.Tab(
-            label=format_date_tab(date),
-            value=date,
-            children=tab_content
-        ))
+def default_grid_view(date):
+    """卡片列表的當前狀態: 日期、排序、過濾條件、是否還有下一頁和下一頁的 cursor"""
+    return {'date': date, 'sort': 'desc', 'float_risk': [], 'sector': [], 'has_more': False, 'cursor': None}
 
+def load_more_style(has_more):
+    return {'display': 'block' if has_more else 'none'}
 
-    
+def create_grid_controls(view, options):
+    """排序和過濾 (Float Risk / Sector) 控件"""
+    return html.Div([
+        dcc.Dropdown(id='grid-sort', options=SORT_OPTIONS, value=view['sort'],
+                     clearable=False, className='grid-control'),
+        dcc.Dropdown(id='grid-float-risk', options=options.get('float_risk', []), value=view['float_risk'],
+                     multi=True, placeholder='Float Risk', className='grid-control'),
+        dcc.Dropdown(id='grid-sector', options=options.get('sector', []), value=view['sector'],
+                     multi=True, placeholder='Sector', className='grid-control'),
+    ], className='grid-controls')
+
+def create_card_grid(date, stocks, view, options):
+    """分頁的卡片列表: 先顯示第一頁，滾動到底部時 (assets/card_grid.js) 再載入下一頁
+
+    列表的狀態 (grid-view) 放在頁面層級 (見 create_grid_view_store)，切換到策略標籤後仍然存在。
+    """
     return html.Div([
-        create_header(title, f"數據更新至 {sorted_dates[0]}"),
+        create_grid_controls(view, options),
+        html.Div(
+            [create_stock_card(stock) for stock in stocks],
+            className='stock-list',
+            id={'type': 'stock-list', 'index': date}
+        ),
+        html.Button('Load more', id='grid-load-more', className='grid-load-more',
+                    style=load_more_style(view['has_more'])),
+    ])
+
+def create_grid_view_store(view):
+    """卡片列表的狀態，不放在 date-tab-content 裡面: 實時更新的回調總是要讀取它"""
+    return dcc.Store(id='grid-view', data=view)
+
+def create_date_tab_content(date, stocks, view, options):
+    """一個日期標籤的內容 (該日期的卡片列表)"""
+    return html.Div([
+        html.H2(f"{page_title} - {date}", style={'margin-bottom': '20px', 'margin-left': '30px'}),
+        create_card_grid(date, stocks, view, options)
+    ])
+
+def create_tabs_for_stocks(dates, selected_stocks, view, options):
+    """創建包含多個日期標籤的頁面
+
+    只渲染最新日期 (dates[0]) 的卡片，切換標籤時由 callbacks/main.py 的 render_date_tab 載入。
+    """
+    # ➊ 加入策略整理頁面為第一個 Tab
+    tabs = [dcc.Tab(label="🧠 策略整理", value="strategy")]
+    tabs += [dcc.Tab(label=format_date_tab(date), value=date) for date in dates]
+
+    return html.Div([
+        create_header(title, f"數據更新至 {dates[0]}"),
         dcc.Tabs(
             id="date-tabs",
-            value=sorted_dates[0],  # 默認顯示最新日期
+            value=dates[0],  # 默認顯示最新日期
             children=tabs,
             style={'margin-bottom': '20px'}
         ),
+        html.Div(create_date_tab_content(dates[0], selected_stocks, view, options), id='date-tab-content'),
+        create_grid_view_store(view),
+        *create_live_update_components(),
         create_footer()
     ])
 
+def create_live_update_components():
+    """實時更新用的組件: assets/live_top_list.js 看到 #live-top-list 才會訂閱推送"""
+    return [
+        html.Div(id='live-top-list', style={'display': 'none'}),
+        dcc.Store(id='live-top-list-event'),
+    ]
+
 def create_empty_state(date):
     return html.Div([
         create_header(title, f"Data as of {date}"),
@@ -91,26 +118,23 @@ def create_empty_state(date):
 
 
 
-def create_stock_list_page(stocks_data):
-    if not stocks_data:
+def create_stock_list_page(dates, stocks_data, view, options):
+    """dates 是要顯示的日期 (由新到舊)，stocks_data 是最新日期第一頁的卡片數據"""
+    if not dates:
         return create_empty_state("N/A")
     
-    # 檢查是否有不同日期的數據
-    unique_dates = {stock.get('today_date') for stock in stocks_data if stock.get('today_date')}
-    
-    if len(unique_dates) > 1:
-        return create_tabs_for_stocks(stocks_data)
+    if len(dates) > 1:
+        return create_tabs_for_stocks(dates, stocks_data, view, options)
     else:
         # 只有一個日期的數據，顯示簡單列表
-        date = safe_get(stocks_data[0], 'today_date') if stocks_data else 'N/A'
+        date = dates[0]
         return html.Div([
             create_header(title, f"Data as of {date}"),
             html.Div([
                 html.H2(page_title, style={'margin-bottom': '20px', 'margin-left': '50px'}),
-                html.Div(
-                    [create_stock_card(stock) for stock in stocks_data],
-                    className='stock-list'
-                )
+                create_card_grid(date, stocks_data, view, options)
             ], className='main-content'),
+            create_grid_view_store(view),
+            *create_live_update_components(),
             create_footer()
         ])
\ No newline at end of file
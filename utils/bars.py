@@ -0,0 +1,218 @@
+import re
+import warnings
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from utils.chart_format import is_columnar, to_epoch_seconds
+
+# NumPy 版 K 線處理: 一次解析成數組，之後用 mask / argsort 過濾排序，最後再輸出。
+# 時間統一為 epoch 秒 (int64)，naive datetime 視為 UTC，與 utils/chart_format.py 一致。
+# 帶時區的時間另外記錄原來的 UTC 偏移 (秒)，輸出時還原，交易日 (session) 也按 K 線自己的時區計算。
+
+SECONDS_PER_DAY = 86400
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+_INVALID_TIME = np.iinfo(np.int64).min
+# 沒有時區的時間 (naive) 的偏移
+NAIVE = np.iinfo(np.int64).min
+_OFFSET_RE = re.compile(r'(Z|[+-]\d{2}:?\d{2})$')
+
+
+def _offset_of(value):
+    """時間的 UTC 偏移 (秒)，沒有時區時返回 NAIVE"""
+    if isinstance(value, str):
+        match = _OFFSET_RE.search(value)
+        if match is None or len(value) < 19:
+            return NAIVE
+        suffix = match.group(1)
+        if suffix == 'Z':
+            return 0
+        sign = -1 if suffix[0] == '-' else 1
+        digits = suffix[1:].replace(':', '')
+        return sign * (int(digits[:2]) * 3600 + int(digits[2:]) * 60)
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return int(value.utcoffset().total_seconds())
+    return NAIVE
+
+
+def _parse_offsets(values):
+    """每個時間的 UTC 偏移
+
+    偏移總在字串的最後 6 個字符內，同一組 K 線的結尾只有幾種，按結尾分組後每種只解析一次。
+    """
+    try:
+        # 都是完整的日期時間字串時 (len 對 datetime / None 拋出 TypeError)
+        if values and min(map(len, values)) >= 19:
+            keys = [value[-6:] for value in values]
+            offsets = {key: _offset_of('0' * 19 + key) for key in set(keys)}
+            return np.array([offsets[key] for key in keys], dtype=np.int64)
+    except TypeError:
+        pass
+    return np.array([_offset_of(value) for value in values], dtype=np.int64)
+
+
+def _format_offset(offset):
+    """偏移秒數轉成 isoformat 的後綴 (+HH:MM)，和 datetime.isoformat() 相同"""
+    sign = '-' if offset < 0 else '+'
+    hours, minutes = divmod(abs(int(offset)) // 60, 60)
+    return f"{sign}{hours:02d}:{minutes:02d}"
+
+
+def _parse_times(values):
+    """把 datetime / ISO 字串列表轉成 epoch 秒數組，無法解析的為 _INVALID_TIME"""
+    try:
+        with warnings.catch_warnings():
+            # 帶時區的時間會被轉成 UTC，numpy 會發出警告
+            warnings.simplefilter("ignore")
+            parsed = np.array(values, dtype='datetime64[s]')
+        times = parsed.astype(np.int64)
+        times[np.isnat(parsed)] = _INVALID_TIME
+        return times
+    except (ValueError, TypeError):
+        pass
+
+    # 格式不統一時逐個解析
+    times = np.empty(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        try:
+            times[i] = to_epoch_seconds(value) if value is not None else _INVALID_TIME
+        except (ValueError, TypeError, AttributeError):
+            times[i] = _INVALID_TIME
+    return times
+
+
+def _float_column(values):
+    # None 會變成 nan
+    return np.array(values, dtype=np.float64)
+
+
+def _round_significant(values, digits=7):
+    """保留 digits 位有效數字 (float32 精度)，JSON 輸出更短；向量化版的 chart_format.to_float32"""
+    result = values.copy()
+    finite = np.isfinite(values) & (values != 0)
+    selected = values[finite]
+    decimals = digits - 1 - np.floor(np.log10(np.abs(selected))).astype(np.int64)
+    scale = 10.0 ** np.abs(decimals)
+    # 除以 / 乘以 10 的整數次冪得到的是最接近的 double，repr 會是最短形式
+    result[finite] = np.where(
+        decimals >= 0,
+        np.round(selected * scale) / scale,
+        np.round(selected / scale) * scale,
+    )
+    return result
+
+
+def _to_list(values):
+    if np.isnan(values).any():
+        return np.where(np.isnan(values), None, values).tolist()
+    return values.tolist()
+
+
+def _volume_list(values):
+    """成交量不做有效數字截取，整數值輸出為 int"""
+    return [None if value is None else int(value) if value.is_integer() else value
+            for value in _to_list(values)]
+
+
+class Bars:
+    """以 NumPy 數組保存的一組 K 線
+
+    t: epoch 秒, open/high/low/close/volume: float64,
+    offset: 原來的 UTC 偏移 (秒，沒有時區時為 NAIVE)
+    """
+
+    __slots__ = ('t',) + PRICE_FIELDS + ('offset',)
+
+    def __init__(self, t, open, high, low, close, volume, offset=None):
+        self.t = t
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.offset = np.full(len(t), NAIVE, dtype=np.int64) if offset is None else offset
+
+    def __len__(self):
+        return len(self.t)
+
+    #region Parse
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=np.int64), *(np.empty(0) for _ in PRICE_FIELDS))
+
+    @classmethod
+    def from_records(cls, chart_data):
+        """從 [{'datetime','open','high','low','close','volume'}, ...] 或列式格式建立，只解析一次"""
+        if not chart_data:
+            return cls.empty()
+        if is_columnar(chart_data):
+            return cls.from_columnar(chart_data)
+
+        raw_times = [item.get('datetime') for item in chart_data]
+        times = _parse_times(raw_times)
+        columns = [_float_column([item.get(field, 0) for item in chart_data]) for field in PRICE_FIELDS]
+        return cls(times, *columns, _parse_offsets(raw_times)).mask(times != _INVALID_TIME)
+
+    @classmethod
+    def from_columnar(cls, columns):
+        return cls(
+            np.asarray(columns['t'], dtype=np.int64),
+            *(_float_column(columns[key]) for key in ('o', 'h', 'l', 'c', 'v'))
+        )
+
+    #region Transform
+    def mask(self, keep):
+        return Bars(self.t[keep], *(getattr(self, field)[keep] for field in PRICE_FIELDS), self.offset[keep])
+
+    def sorted(self):
+        if len(self.t) < 2 or bool(np.all(self.t[:-1] <= self.t[1:])):
+            return self
+        return self.mask(np.argsort(self.t, kind='stable'))
+
+    def tail_from(self, start):
+        """已排序時，用二分查找保留 t >= start 的 K 線 (切片，不複製數組)"""
+        index = int(np.searchsorted(self.t, start, side='left'))
+        return Bars(self.t[index:], *(getattr(self, field)[index:] for field in PRICE_FIELDS), self.offset[index:])
+
+    def local_offset(self, index):
+        """第 index 根 K 線的 UTC 偏移 (秒)，沒有時區時為 0 (按 UTC 計算)"""
+        offset = int(self.offset[index])
+        return 0 if offset == NAIVE else offset
+
+    #region Emit
+    def to_records(self, time_key='datetime', iso=False):
+        """輸出 [{time_key, open, high, low, close, volume}, ...]
+
+        帶時區的時間還原成原來的偏移 (iso 時帶 +HH:MM 後綴)，naive 的時間仍然是 naive。
+        """
+        if not len(self.t):
+            return []
+        naive = self.offset == NAIVE
+        local = self.t + np.where(naive, 0, self.offset)
+        if iso:
+            times = np.datetime_as_string(local.astype('datetime64[s]'))
+            if not naive.all():
+                offsets, inverse = np.unique(self.offset, return_inverse=True)
+                suffixes = np.array(['' if offset == NAIVE else _format_offset(offset) for offset in offsets])
+                times = np.char.add(times, suffixes[inverse])
+            times = times.tolist()
+        else:
+            times = local.astype('datetime64[s]').astype(object).tolist()
+            for i in np.flatnonzero(~naive).tolist():
+                times[i] = times[i].replace(tzinfo=timezone(timedelta(seconds=int(self.offset[i]))))
+        columns = [_to_list(getattr(self, field)) for field in PRICE_FIELDS]
+        return [
+            {time_key: time, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for time, o, h, l, c, v in zip(times, *columns)
+        ]
+
+    def to_columnar(self):
+        """輸出列式格式 (價格為 float32 精度，成交量不截取)，見 utils/chart_format.py"""
+        return {
+            't': self.t.tolist(),
+            'o': _to_list(_round_significant(self.open)),
+            'h': _to_list(_round_significant(self.high)),
+            'l': _to_list(_round_significant(self.low)),
+            'c': _to_list(_round_significant(self.close)),
+            'v': _volume_list(self.volume),
+        }
@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+
+# 列式 (columnar) K 線格式:
+#   {'t': [epoch 秒], 'o': [...], 'h': [...], 'l': [...], 'c': [...], 'v': [...]}
+# 比每根 K 線一個 dict 的格式少了重複的 key，1 分鐘圖上千根 K 線時 JSON 小很多。
+# 價格只保留 float32 精度 (7 位有效數字)，成交量保持整數，時間統一為 UTC epoch 秒 (naive datetime 視為 UTC)。
+
+COLUMNAR_KEYS = ('t', 'o', 'h', 'l', 'c', 'v')
+PRICE_FIELDS = (('o', 'open'), ('h', 'high'), ('l', 'low'), ('c', 'close'))
+
+
+def to_epoch_seconds(value):
+    """datetime / ISO 字串 / 數字 轉 epoch 秒"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def to_float32(value):
+    """把數值截到 float32 精度，JSON 輸出更短"""
+    if value is None:
+        return None
+    return float(f"{float(value):.7g}")
+
+
+def to_volume(value):
+    """成交量不截取精度，整數值輸出為 int"""
+    if value is None:
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def empty_columnar():
+    return {key: [] for key in COLUMNAR_KEYS}
+
+
+def is_columnar(chart_data):
+    return isinstance(chart_data, dict) and 't' in chart_data
+
+
+def bars_to_columnar(bars):
+    """[{'datetime','open','high','low','close','volume'}, ...] 轉列式格式"""
+    if is_columnar(bars):
+        return bars
+    columns = empty_columnar()
+    for item in bars or []:
+        dt = item.get('datetime', item.get('time'))
+        if dt is None:
+            continue
+        columns['t'].append(to_epoch_seconds(dt))
+        for key, field in PRICE_FIELDS:
+            columns[key].append(to_float32(item.get(field)))
+        columns['v'].append(to_volume(item.get('volume')))
+    return columns
@@ -0,0 +1,75 @@
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli 是可選依賴，沒有安裝時只用 gzip
+    brotli = None
+
+# 響應壓縮 (FastAPI 和 Dash 共用): K 線 / 列表 JSON 重複的 key 和數字很多，壓縮率很高。
+# 小於 COMPRESS_MIN_SIZE 的響應不壓縮 (壓縮省下的字節不值得 CPU 開銷)。
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+# brotli 的 quality 0-11，4 左右壓縮率已經比 gzip 6 好，CPU 開銷相近
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+def is_compressible(content_type):
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def choose_encoding(accept_encoding):
+    """根據 Accept-Encoding 選擇 br / gzip，都不支持時返回 None"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress_body(body, encoding, gzip_level=None, brotli_quality=None):
+    if encoding == "br":
+        quality = COMPRESS_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+        return brotli.compress(body, quality=quality)
+    level = COMPRESS_GZIP_LEVEL if gzip_level is None else gzip_level
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+#region Dash / Flask
+def register_flask_compression(server, minimum_size=None):
+    """給 Flask (Dash 的 app.server) 加上響應壓縮，包括 callback 的 JSON 響應"""
+    minimum_size = COMPRESS_MIN_SIZE if minimum_size is None else minimum_size
+
+    from flask import request
+
+    @server.after_request
+    def compress_response(response):
+        if response.direct_passthrough or response.is_streamed:
+            return response
+        if response.status_code not in (200, 304) or "Content-Encoding" in response.headers:
+            return response
+        if not is_compressible(response.mimetype):
+            return response
+        # 304 也要帶 Vary (和對應的 200 響應一致)，共享緩存按 Accept-Encoding 區分
+        response.vary.add("Accept-Encoding")
+        if response.status_code != 200:
+            return response
+
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        body = response.get_data()
+        if encoding is None or len(body) < minimum_size:
+            return response
+        response.set_data(compress_body(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    return compress_response
@@ -1,9 +1,12 @@
 
-from bson import ObjectId
 import json
 import pandas as pd
 from plotly import graph_objects as go
 from datetime import datetime
+from utils.bars import Bars
+from utils.chart_format import empty_columnar
+from utils.serialization import to_jsonable_scalar
+from utils.timeframes import TIMEFRAMES, timeframe_bars
 
 
 def safe_get(data, key, default="N/A"):
@@ -54,14 +57,29 @@ def get_chart_data(data_dict, chart_key='1m_chart_data'):
 
 
 
+#region Chart Timeframes
+def build_chart_payload(data):
+    """從 MongoDB 文檔中取出三個時間框架的 K 線 (按 utils/timeframes.py 截取窗口)，
+    輸出列式格式，可直接放進 dcc.Store"""
+    if not safe_get(data, '1d_chart_data', []):
+        print("找不到今天的 MongoDB 資料，使用假資料")
+        chart_1m = [
+            {'datetime': datetime(2025, 5, 22, 13, 27), 'open': 0.41965, 'high': 0.41965, 'low': 0.41965, 'close': 0.41965, 'volume': 1.0},
+            {'datetime': datetime(2025, 5, 22, 13, 28), 'open': 0.42, 'high': 0.421, 'low': 0.419, 'close': 0.4205, 'volume': 5.0},
+        ]
+        return {'1min': Bars.from_records(chart_1m).to_columnar(), '5min': empty_columnar(), '1day': empty_columnar()}
+
+    return {
+        config['store_key']: timeframe_bars(safe_get(data, config['field'], []), timeframe).to_columnar()
+        for timeframe, config in TIMEFRAMES.items()
+    }
+
 
 
 class JSONEncoder(json.JSONEncoder):
     def default(self, o):
-        if isinstance(o, datetime):
-            # 把 datetime 轉成 ISO 格式字串
-            return o.isoformat()
-        elif isinstance(o, ObjectId):
-            # 把 ObjectId 轉成字串
-            return str(o)
+        # ObjectId / datetime 的轉換與 utils/serialization.py 共用
+        value = to_jsonable_scalar(o)
+        if value is not o:
+            return value
         return super().default(o)
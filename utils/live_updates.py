@@ -0,0 +1,359 @@
+import bisect
+import json
+import math
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from _mongo import CATALOG_SOURCE_COLLECTION, get_mongo_handler
+from components.cards import STOCK_CARD_FIELDS
+from utils.helpers import safe_float
+from utils.serialization import to_jsonable_scalar
+
+# 列表頁的實時更新: 後台線程監聽 fundamentals_of_top_list_symbols 的 change stream，
+# 把卡片字段的變化 (upsert / delete) 推送給所有打開列表頁的瀏覽器 (SSE)，
+# 瀏覽器只更新對應的一張卡片 (見 callbacks/main.py 的 apply_live_updates)。
+# 單機 MongoDB 沒有 change stream，自動改成每 LIVE_POLL_INTERVAL 秒查詢一次並比較差異。
+# 一個進程只有一個監聽線程，查詢次數和瀏覽器數量無關。
+# 監聽線程同時維護每個日期按涨跌幅排序的卡片 (進程內的列表數據)，
+# 列表頁直接從內存取數據，不用每次導航都查詢數據庫。
+
+# 輪詢模式的查詢間隔 (秒)
+LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", "5"))
+# 沒有事件時多久發一次 SSE 心跳 (秒)，避免代理斷開空閒連接
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", "15"))
+# 每個瀏覽器最多積壓多少個事件，超過時通知瀏覽器重新載入
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+# change stream 模式下多久完整重新同步一次 (秒)，日期範圍隨之向前滾動
+LIVE_RESYNC_INTERVAL = float(os.getenv("LIVE_RESYNC_INTERVAL", "300"))
+# 出錯後重試的最長等待時間 (秒)，從 LIVE_POLL_INTERVAL 開始每次加倍
+LIVE_MAX_BACKOFF = float(os.getenv("LIVE_MAX_BACKOFF", "60"))
+# 列表頁顯示最近幾個交易日 (週末和假期沒有數據，不算在內)，內存中只跟蹤這些日期
+LIST_LOOKBACK_DAYS = int(os.getenv("LIST_LOOKBACK_DAYS", "5"))
+
+SORT_FIELD = 'close_change_percentage'
+CHANGE_OPERATIONS = ['insert', 'update', 'replace', 'delete']
+
+
+def card_of(doc):
+    """文檔中列表卡片需要的字段 (JSON 可用)，涨跌幅轉成 float (不是數字時為 None)"""
+    card = {field: to_jsonable_scalar(doc.get(field)) for field in STOCK_CARD_FIELDS}
+    value = safe_float(doc.get(SORT_FIELD), None)
+    card[SORT_FIELD] = value if value is not None and math.isfinite(value) else None
+    if '_id' in doc:
+        # 卡片列表的 keyset 分頁用 (api/services/pagination.py 的 encode_cursor)
+        card['_id'] = str(doc['_id'])
+    return card
+
+
+# ObjectId 的十六進制字符取反，字符串升序即 _id 降序
+DESCENDING_HEX = str.maketrans('0123456789abcdef', 'fedcba9876543210')
+
+
+def sort_key(doc_id, card):
+    """日期內的排序鍵: 涨跌幅由大到小，相同時按 _id 由大到小 (和數據庫的 keyset 排序相同)"""
+    return (-card[SORT_FIELD], str(doc_id).translate(DESCENDING_HEX))
+
+
+def recent_cutoff(days=LIST_LOOKBACK_DAYS):
+    """按日曆天計算的起始日期 (查不到交易日目錄時使用)"""
+    today = datetime.now(ZoneInfo("America/New_York")).date()
+    return (today - timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+class TopListWatcher:
+    """監聽一個集合的卡片字段變化，分發給訂閱者的隊列，並在內存中維護每個日期排好序的卡片
+
+    事件格式: {"op": "upsert", "card": {...}} / {"op": "delete", "card": {...}}
+    (delete 的 card 是刪除前的卡片) / {"op": "reset"} (隊列溢出，瀏覽器應重新載入)
+    """
+
+    def __init__(self, collection_name=CATALOG_SOURCE_COLLECTION, handler=None, poll_interval=None):
+        self.collection_name = collection_name
+        self.handler = handler
+        self.poll_interval = LIVE_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.mode = None
+        self.events_published = 0
+        self.synced_at = None
+        self._cutoff = None
+        self._cards = {}
+        # {date: [(sort_key, doc_id), ...]}，用 bisect 保持有序
+        self._by_date = {}
+        # {symbol: {date: doc_id}}，詳情頁按 symbol (+ 日期) 直接找到文檔
+        self._by_symbol = {}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def mongo(self):
+        return self.handler or get_mongo_handler()
+
+    @property
+    def collection(self):
+        return self.mongo.db[self.collection_name]
+
+    #region Subscribers
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=LIVE_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        self.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, events):
+        if not events:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.events_published += len(events)
+        for subscriber in subscribers:
+            try:
+                for event in events:
+                    subscriber.put_nowait(event)
+            except queue.Full:
+                # 瀏覽器跟不上: 清空積壓，只留下 reset
+                self.unsubscribe(subscriber)
+                while not subscriber.empty():
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        break
+                subscriber.put_nowait({"op": "reset"})
+
+    def cards(self):
+        """當前跟蹤的所有卡片 (快照)"""
+        with self._lock:
+            return list(self._cards.values())
+
+    #region Store
+    def is_warm(self):
+        """線程在運行並且已經完成第一次同步 (內存中的數據可以代替數據庫查詢)"""
+        return self.synced_at is not None and self._thread is not None and self._thread.is_alive()
+
+    def dates(self):
+        """內存中最近 LIST_LOOKBACK_DAYS 個有數據的日期 (由新到舊)"""
+        with self._lock:
+            return sorted(self._by_date, reverse=True)[:LIST_LOOKBACK_DAYS]
+
+    def cards_for_date(self, date, limit=None):
+        """某個日期按涨跌幅排序的卡片"""
+        with self._lock:
+            return [self._cards[doc_id] for _, doc_id in self._by_date.get(date, [])[:limit]]
+
+    def find_id(self, symbol, date=None):
+        """symbol 在 date (默認最新日期) 的文檔 _id，內存中沒有時返回 None"""
+        with self._lock:
+            dates = self._by_symbol.get(symbol)
+            if not dates:
+                return None
+            return dates.get(date) if date else dates[max(dates)]
+
+    def _index(self, doc_id, old_card, new_card):
+        """更新排序索引和 symbol 索引，調用前要持有 self._lock"""
+        if old_card is not None:
+            dates = self._by_symbol.get(old_card['symbol'], {})
+            if dates.get(old_card['today_date']) == doc_id:
+                del dates[old_card['today_date']]
+            if not dates:
+                self._by_symbol.pop(old_card['symbol'], None)
+            entries = self._by_date.get(old_card['today_date'], [])
+            position = bisect.bisect_left(entries, (sort_key(doc_id, old_card), doc_id))
+            if position < len(entries) and entries[position][1] == doc_id:
+                entries.pop(position)
+            if not entries:
+                self._by_date.pop(old_card['today_date'], None)
+        if new_card is not None:
+            entries = self._by_date.setdefault(new_card['today_date'], [])
+            bisect.insort(entries, (sort_key(doc_id, new_card), doc_id))
+            self._by_symbol.setdefault(new_card['symbol'], {})[new_card['today_date']] = doc_id
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "running": self._thread is not None and self._thread.is_alive(),
+                "subscribers": len(self._subscribers),
+                "cards": len(self._cards),
+                "dates": len(self._by_date),
+                "symbols": len(self._by_symbol),
+                "warm": self.synced_at is not None,
+                "events_published": self.events_published,
+            }
+
+    #region Diff
+    def _apply(self, doc_id, doc, cutoff):
+        """用最新的文檔更新狀態，返回事件 (卡片字段沒有變化時返回 None)"""
+        if doc is None or not isinstance(doc.get('today_date'), str) or doc['today_date'] < cutoff:
+            return self._remove(doc_id)
+        card = card_of(doc)
+        if card[SORT_FIELD] is None:
+            return self._remove(doc_id)
+        with self._lock:
+            old_card = self._cards.get(doc_id)
+            if old_card == card:
+                return None
+            self._cards[doc_id] = card
+            self._index(doc_id, old_card, card)
+        return {"op": "upsert", "card": card}
+
+    def _remove(self, doc_id):
+        with self._lock:
+            card = self._cards.pop(doc_id, None)
+            if card is not None:
+                self._index(doc_id, card, None)
+        return {"op": "delete", "card": card} if card else None
+
+    def _resync(self):
+        """重新查詢整個範圍，和現有狀態比較，返回差異事件"""
+        dates = self.mongo.recent_trading_dates(LIST_LOOKBACK_DAYS)
+        if dates:
+            self._cutoff = dates[-1]
+        elif self._cutoff is None:
+            self._cutoff = recent_cutoff()
+        cutoff = self._cutoff
+        query = {'today_date': {'$gte': cutoff}, SORT_FIELD: {'$ne': None}}
+        docs = {doc['_id']: doc for doc in self.collection.find(query, STOCK_CARD_FIELDS)}
+        with self._lock:
+            removed = [doc_id for doc_id in self._cards if doc_id not in docs]
+        events = [self._remove(doc_id) for doc_id in removed]
+        events += [self._apply(doc_id, doc, cutoff) for doc_id, doc in docs.items()]
+        self.synced_at = time.monotonic()
+        return [event for event in events if event]
+
+    #region Listener Thread
+    def start(self):
+        """啟動監聽線程 (已經在運行時不做任何事)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            # fork 之後的子進程從這裡重新同步，之前的數據不算數
+            self.synced_at = None
+            self._thread = threading.Thread(target=self._run, name="top-list-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        polling = False
+        delay = self.poll_interval
+        while not self._stop.is_set():
+            synced_at = self.synced_at
+            try:
+                if polling:
+                    self._poll()
+                else:
+                    self._watch()
+            except Exception as e:
+                # 還沒打開過 change stream 就失敗 (單機服務器 code 40573、驅動不支持 watch 等)，
+                # 之後一直用輪詢；連接錯誤 (PyMongoError 中除 OperationFailure 以外的) 只是暫時的
+                transient = isinstance(e, PyMongoError) and not isinstance(e, OperationFailure)
+                if not polling and not transient and self.mode != "change_stream":
+                    print(f"Change stream unavailable, falling back to polling: {e}")
+                    polling = True
+                    continue
+                # 上一輪同步成功過就從頭計算等待時間，否則加倍 (最多 LIVE_MAX_BACKOFF 秒)
+                if self.synced_at != synced_at:
+                    delay = self.poll_interval
+                print(f"Live update error: {e!r}, retrying in {delay:.0f}s")
+                self._stop.wait(delay)
+                delay = min(delay * 2, LIVE_MAX_BACKOFF)
+
+    def _watch(self):
+        pipeline = [{'$match': {'operationType': {'$in': CHANGE_OPERATIONS}}}]
+        with self.collection.watch(pipeline, full_document='updateLookup', max_await_time_ms=1000) as stream:
+            self.mode = "change_stream"
+            # 先打開 stream 再重新查詢，期間的變化不會丟失 (重複的事件在 _apply 中被忽略)
+            self.publish(self._resync())
+            while not self._stop.is_set() and stream.alive:
+                if time.monotonic() - self.synced_at >= LIVE_RESYNC_INTERVAL:
+                    # 定期重新同步: 新的交易日出現後起始日期向前滾動，舊日期移出內存
+                    self.publish(self._resync())
+                change = stream.try_next()
+                if change is None:
+                    continue
+                doc_id = change['documentKey']['_id']
+                if change['operationType'] == 'delete':
+                    event = self._remove(doc_id)
+                else:
+                    event = self._apply(doc_id, change.get('fullDocument'), self._cutoff)
+                self.publish([event] if event else [])
+
+    def _poll(self):
+        self.mode = "polling"
+        while not self._stop.is_set():
+            self.publish(self._resync())
+            self._stop.wait(self.poll_interval)
+
+
+#region Shared Watcher
+_shared_watcher = None
+_shared_lock = threading.Lock()
+
+
+def get_top_list_watcher():
+    """返回進程內共用的 TopListWatcher (start() 之後才開始同步)"""
+    global _shared_watcher
+    if _shared_watcher is None:
+        with _shared_lock:
+            if _shared_watcher is None:
+                _shared_watcher = TopListWatcher()
+    return _shared_watcher
+
+
+#region Dash / Flask
+def sse_message(event):
+    return f"data: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+def register_live_updates(server, path='/live/top-list'):
+    """給 Flask (Dash 的 app.server) 加上列表頁的 SSE 端點，以及 {path}/stats (監聽線程的狀態)
+
+    每個連接佔用一個線程，部署時要用多線程的 worker (例如 gunicorn --threads / gthread)。
+    """
+    from flask import Response, jsonify, stream_with_context
+
+    @server.route(f"{path}/stats")
+    def live_top_list_stats():
+        return jsonify(get_top_list_watcher().stats())
+
+    @server.route(path)
+    def live_top_list():
+        watcher = get_top_list_watcher()
+        subscriber = watcher.subscribe()
+
+        def stream():
+            try:
+                # 斷線後瀏覽器 (EventSource) 5 秒後自動重連
+                yield "retry: 5000\n\n"
+                while True:
+                    try:
+                        event = subscriber.get(timeout=LIVE_HEARTBEAT)
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+                        continue
+                    yield sse_message(event)
+                    if event["op"] == "reset":
+                        return
+            finally:
+                watcher.unsubscribe(subscriber)
+
+        return Response(
+            stream_with_context(stream()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+
+    return live_top_list
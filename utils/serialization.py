@@ -0,0 +1,42 @@
+from datetime import date, datetime
+
+from bson import ObjectId, Decimal128
+
+# Dash 端把 MongoDB 文檔轉成 dcc.Store 可用的數據 (ObjectId -> str, datetime -> ISO 字串)。
+# API 端輸出 Extended JSON，見 api/services/mongo_json.py。
+
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def to_jsonable_scalar(value):
+    """單個 BSON 值轉成 JSON 可用的值，其他類型原樣返回"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal128):
+        return str(value)
+    return value
+
+
+def to_jsonable(value):
+    """把整個文檔轉成 JSON 可用的結構 (用棧迭代，不遞歸，不修改原文檔)"""
+    root = [value]
+    stack = [root]
+    while stack:
+        container = stack.pop()
+        items = container.items() if isinstance(container, dict) else enumerate(container)
+        for key, item in items:
+            if isinstance(item, _SCALAR_TYPES):
+                continue
+            if isinstance(item, dict):
+                item = dict(item)
+            elif isinstance(item, (list, tuple)):
+                item = list(item)
+            else:
+                container[key] = to_jsonable_scalar(item)
+                continue
+            # 先複製再放回，子容器稍後處理
+            container[key] = item
+            stack.append(item)
+    return root[0]
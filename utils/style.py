@@ -173,6 +173,27 @@ index_string = '''
         padding: 15px;
         cursor: pointer;
         transition: transform 0.2s;
+        /* 視窗外的卡片不做排版和繪製 */
+        content-visibility: auto;
+        contain-intrinsic-size: auto 180px;
+    }
+
+    .grid-controls {
+        display: grid;
+        grid-template-columns: 180px repeat(2, minmax(200px, 1fr));
+        gap: 10px;
+        margin: 0 30px;
+        color: #121212;
+    }
+
+    .grid-load-more {
+        margin: 20px auto;
+        padding: 8px 20px;
+        background-color: #1f2c33;
+        color: #e0e0e0;
+        border: 1px solid #3498db;
+        border-radius: 4px;
+        cursor: pointer;
     }
 
     .stock-card:hover {
@@ -0,0 +1,137 @@
+from utils.bars import Bars, SECONDS_PER_DAY
+
+# 圖表時間框架註冊表，API (/stocks/{symbol}/chart) 和 Dash 詳情頁共用。
+#   field     : MongoDB 文檔中的 K 線字段
+#   store_key : Dash chart-data-store 中的 key
+#   window    : 顯示窗口 (以最新一根 K 線為準)
+#       ('hours', n)   最近 n 小時
+#       ('session', _) 最新一個交易日
+#       ('days', n)    最近 n 天
+#   max_bars  : 數據庫端截取時最多返回的 K 線數量 (保險上限)
+TIMEFRAMES = {
+    '1m': {'field': '1m_chart_data', 'store_key': '1min', 'window': ('hours', 3), 'max_bars': 3 * 60 + 1},
+    '5m': {'field': '5m_chart_data', 'store_key': '5min', 'window': ('session', None), 'max_bars': 24 * 12},
+    '1d': {'field': '1d_chart_data', 'store_key': '1day', 'window': ('days', 30), 'max_bars': 30 + 1},
+}
+
+# 舊代碼使用的名稱
+TIMEFRAME_ALIASES = {'1min': '1m', '5min': '5m', '1day': '1d'}
+
+
+def resolve_timeframe(name):
+    """'1m' / '1min' 等名稱轉成註冊表的 key，未知名稱拋出 ValueError"""
+    key = TIMEFRAME_ALIASES.get(name, name)
+    if key not in TIMEFRAMES:
+        raise ValueError(f"Unknown timeframe: {name}")
+    return key
+
+
+def window_start(timeframe, latest, offset=0):
+    """返回窗口起點 (epoch 秒)，latest 為最新一根 K 線的時間，offset 是它的 UTC 偏移 (秒)
+
+    session 窗口從 K 線自己時區的當天 00:00 開始 (沒有時區的時間按 UTC)。
+    """
+    unit, size = TIMEFRAMES[resolve_timeframe(timeframe)]['window']
+    if unit == 'hours':
+        return latest - size * 3600
+    if unit == 'session':
+        return (latest + offset) // SECONDS_PER_DAY * SECONDS_PER_DAY - offset
+    if unit == 'days':
+        return latest - size * SECONDS_PER_DAY
+    raise ValueError(f"Unknown window unit: {unit}")
+
+
+def window_bars(bars, timeframe):
+    """排序後用二分查找截取時間框架對應的窗口"""
+    bars = bars.sorted()
+    if not len(bars):
+        return bars
+    return bars.tail_from(window_start(timeframe, int(bars.t[-1]), bars.local_offset(-1)))
+
+
+def timeframe_bars(chart_data, timeframe):
+    """從 MongoDB 的 K 線字段解析並截取窗口"""
+    return window_bars(Bars.from_records(chart_data), timeframe)
+
+
+#region Server-side Window
+def _bar_time_expr(bar):
+    # K 線時間可能是 ISO 字串或 BSON Date，無法解析的當作 null (會被過濾掉)
+    return {"$convert": {"input": f"{bar}.datetime", "to": "date", "onError": None, "onNull": None}}
+
+
+def _offset_ms_expr(raw):
+    """ISO 字串結尾的 UTC 偏移 (+HH:MM / -HHMM / Z) 轉毫秒，BSON Date 和沒有時區的字串為 0"""
+    found = {"$regexFind": {
+        "input": {"$cond": [{"$eq": [{"$type": raw}, "string"]}, raw, ""]},
+        "regex": r"([+-])(\d{2}):?(\d{2})$",
+    }}
+    return {"$let": {
+        "vars": {"found": found},
+        "in": {"$cond": [
+            {"$eq": ["$$found", None]},
+            0,
+            {"$multiply": [
+                {"$cond": [{"$eq": [{"$arrayElemAt": ["$$found.captures", 0]}, "-"]}, -1, 1]},
+                {"$add": [
+                    {"$multiply": [{"$toInt": {"$arrayElemAt": ["$$found.captures", 1]}}, 3600 * 1000]},
+                    {"$multiply": [{"$toInt": {"$arrayElemAt": ["$$found.captures", 2]}}, 60 * 1000]},
+                ]},
+            ]},
+        ]},
+    }}
+
+
+def window_expr(timeframe):
+    """MongoDB 聚合表達式: 在數據庫端用 $filter / $slice 截取 K 線數組的窗口
+
+    與 window_bars 的規則相同 (以最新一根 K 線為準)。字段不是數組 (例如列式格式) 時原樣返回。
+    """
+    config = TIMEFRAMES[resolve_timeframe(timeframe)]
+    field = "$" + config['field']
+    unit, size = config['window']
+
+    if unit == 'hours':
+        start = {"$subtract": ["$$latest", size * 3600 * 1000]}
+    elif unit == 'session':
+        # 最新一根 K 線自己時區的當天 00:00 = latest - ((latest + offset) mod 一天的毫秒數)
+        latest_raw = {"$arrayElemAt": [{"$filter": {
+            "input": field, "as": "bar", "cond": {"$eq": [_bar_time_expr("$$bar"), "$$latest"]},
+        }}, 0]}
+        start = {"$let": {
+            "vars": {"offset": _offset_ms_expr({"$let": {"vars": {"bar": latest_raw}, "in": "$$bar.datetime"}})},
+            "in": {"$subtract": ["$$latest", {"$mod": [
+                {"$add": [{"$toLong": "$$latest"}, "$$offset"]}, SECONDS_PER_DAY * 1000,
+            ]}]},
+        }}
+    elif unit == 'days':
+        start = {"$subtract": ["$$latest", size * SECONDS_PER_DAY * 1000]}
+    else:
+        raise ValueError(f"Unknown window unit: {unit}")
+
+    windowed = {"$let": {
+        "vars": {"latest": {"$max": {"$map": {"input": field, "as": "bar", "in": _bar_time_expr("$$bar")}}}},
+        "in": {"$filter": {"input": field, "as": "bar", "cond": {"$gte": [_bar_time_expr("$$bar"), start]}}},
+    }}
+    windowed = {"$slice": [windowed, -config['max_bars']]}
+    return {"$cond": [{"$isArray": field}, windowed, field]}
+
+
+def chart_window_pipeline(query, timeframes=None, fields=None):
+    """查詢一個文檔 (最新日期優先)，K 線字段只返回窗口內的數據
+
+    fields 為 None 時返回完整文檔 (K 線字段被替換為窗口)；
+    否則只返回 fields 和所選時間框架的 K 線字段。
+    """
+    timeframes = [resolve_timeframe(tf) for tf in (timeframes or TIMEFRAMES)]
+    windows = {TIMEFRAMES[tf]['field']: window_expr(tf) for tf in timeframes}
+    pipeline = [
+        {"$match": query},
+        {"$sort": {"today_date": -1}},
+        {"$limit": 1},
+    ]
+    if fields is None:
+        pipeline.append({"$addFields": windows})
+    else:
+        pipeline.append({"$project": {**{name: 1 for name in fields}, **windows}})
+    return pipeline